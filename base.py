@@ -1,19 +1,54 @@
 import logging, time
 
-from threading import Thread
-from abc import ABCMeta, abstractmethod
-from bson import ObjectId
-from blinker import signal
+from abc import ABCMeta
+from itertools import count
+from weakref import WeakMethod
+from blinker import ANY
 
 logger = logging.getLogger('Base')
 
+# consumer ids, start from 1 so an id is never falsy as a sender
+_consumer_ids = count(1)
+
+# placeholder sender in `_subs`, stands for the consumer's own id
+SELF = object()
+
+
+def _drop_handler(ref):
+	"""Remove a dead handler reference from the routes
+	- called back by the `WeakMethod` once its consumer is collected
+	"""
+	for routes in (BaseConsumer._routes, BaseConsumer._routes_any):
+		for route, refs in list(routes.items()):
+			if ref in refs:
+				refs = tuple(r for r in refs if r is not ref)
+				if refs:
+					routes[route] = refs
+				else:
+					routes.pop(route)
+
 
 class BaseConsumer(metaclass=ABCMeta):
 	"""Base message consumer & publisher that
 	- takes a list of subscriptions parameters to consume
 		from a different thread
 	- publish message for other consumers to consume
+
+	Note
+	----
+	Messages are routed through process wide tables shared by all consumers,
+	subscribers are looked up by (key, sender) and called directly.
+	Handlers are held weakly, as blinker did, a dropped consumer
+	leaves the routes once collected; `_stop` removes it right away
 	"""
+	# {(key, sender): (WeakMethod, ...)}, subscribers for one specific sender
+	_routes = {}
+	# {key: (WeakMethod, ...)}, subscribers for `ANY` sender
+	_routes_any = {}
+
+	# (key, sender, name of the handler method), built once per class
+	_subs = ()
+
 	def __init__(self, comp_type, required=[]):
 		if comp_type.upper() not in ['MONITOR','EXE','FEED','STGY']:
 			raise ValueError('Given `comp_type` is not correct.')
@@ -21,7 +56,10 @@ class BaseConsumer(metaclass=ABCMeta):
 		self._comp_type = comp_type
 		self.status = 'INIT'
 		self.required = {r.lower(): False for r in required}
-		self.id = ObjectId()
+		self.id = next(_consumer_ids)
+
+		# message body reused by `basic_publish`, None while it is in use
+		self._body = {'group': self.group}
 
 		self._subscriptions()
 		self._setup()
@@ -34,18 +72,49 @@ class BaseConsumer(metaclass=ABCMeta):
 	def __del__(self):
 		self._stop()
 
-	@abstractmethod
 	def subscriptions(self):
-		raise NotImplementedError()
+		"""Resolve the class level `_subs` into (key, sender, handler)
+
+		- Handlers are looked up by name so subclasses can override them
+		"""
+		return [
+			(key, self.id if sender is SELF else sender, getattr(self, name))
+			for key, sender, name in self._subs
+		]
+
+
+	def _connect(self, key, sender, hdl):
+		# routes are immutable tuples, publishing never sees a half updated one
+		ref = WeakMethod(hdl, _drop_handler)
+		if sender is ANY:
+			self._routes_any[key] = self._routes_any.get(key, ()) + (ref, )
+		else:
+			route = (key, sender)
+			self._routes[route] = self._routes.get(route, ()) + (ref, )
 
 
 	def _subscriptions(self):
-		signal('get_comp').connect(self._on_get_comp, sender=self.id)
+		self._connect('get_comp', self.id, self._on_get_comp)
 
 		subs = self.subscriptions()
 		if subs:
 			for key, sender, hdl in subs:
-				signal(key).connect(hdl, sender=sender)
+				self._connect(key, sender, hdl)
+
+
+	def _unsubscriptions(self):
+		"""Remove all handlers bound to this consumer from the routes"""
+		for routes in (self._routes, self._routes_any):
+			for route, refs in list(routes.items()):
+				kept = []
+				for ref in refs:
+					hdl = ref()
+					if hdl is not None and hdl.__self__ is not self:
+						kept.append(ref)
+				if kept:
+					routes[route] = tuple(kept)
+				else:
+					routes.pop(route)
 	
 	
 	def setup(self):
@@ -66,9 +135,8 @@ class BaseConsumer(metaclass=ABCMeta):
 		"""Before everything, we need to setup the environment
 		"""
 		try:
-			thread = Thread(target=self.setup)
-			thread.start()
-			thread.join()
+			# blocking anyway, no need for a thread of its own
+			self.setup()
 		# if something happends here excep what we want, stop it
 		except Exception as exc:
 			raise exc
@@ -77,13 +145,25 @@ class BaseConsumer(metaclass=ABCMeta):
 
 
 	def _stop(self):
+		"""Publish the STOPPED status and leave all routes
+		- call it once a consumer is done, e.g. at the end of a backtest,
+			so it gets no more messages even while still referenced
+		"""
 		self.basic_status_publish('STOPPED')
+		self._unsubscriptions()
 
 
 	def basic_publish(self, key, sender=None, **kws):
 		""" Publish messages through the default settings
+
+		- Handlers must not keep the body, it is reused for next publish
 		"""
-		body_ = {'group': self.group}
+		body_ = self._body
+		reuse = body_ is not None
+		if reuse:
+			self._body = None
+		else:  # publishing from a handler, body is taken
+			body_ = {'group': self.group}
 		if kws:
 			body_.update(kws)
 
@@ -92,7 +172,22 @@ class BaseConsumer(metaclass=ABCMeta):
 		else:
 			sender_ = sender
 
-		return signal(key).send(sender_, body=body_)
+		# `ANY` subscribers go first, e.g. executor fills before strategy ticks
+		rets = []
+		try:
+			for refs in (
+				self._routes_any.get(key, ()), self._routes.get((key, sender_), ())
+			):
+				for ref in refs:
+					hdl = ref()
+					if hdl is not None:  # collected, its entry is being dropped
+						rets.append((hdl, hdl(sender_, body_)))
+		finally:
+			if reuse:
+				body_.clear()
+				body_['group'] = self.group
+				self._body = body_
+		return rets
 
 
 	def basic_status_publish(self, status=None, **kws):
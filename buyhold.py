@@ -15,6 +15,10 @@ class BuyAndHold(BaseStrategy):
 		self.hard_stopped = {s: False for s in symbol_list}
 		self.direction = direction
 
+		# symbols still waiting to get in, buy and hold never exits
+		# so once got a position (or hard stopped), it is done for good
+		self._pending = list(self.pos)
+
 
 	def calculate_signals(self):
 		"""'Buy and Hold' strategy
@@ -26,12 +30,19 @@ class BuyAndHold(BaseStrategy):
 		----------
 		event: A MarketEvent object
 		"""
-		for s in self.pos:
+		if not self._pending: return
+
+		pending = []
+		for s in self._pending:
 			if self.hard_stopped[s]: continue
 			if self.has_position(s): continue
 				
 			self.generate_signal(s, self.direction)
+			pending.append(s)
+		self._pending = pending
 
 
 	def on_hard_stop(self, symbol):
 		self.hard_stopped[symbol] = True
+		if symbol in self._pending:
+			self._pending.remove(symbol)
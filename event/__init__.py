@@ -1,5 +1,5 @@
 from .core import Event
-from .market import MarketEvent, Tick
+from .market import MarketEvent, MarketEventBatch, Tick
 from .signal import SignalEventFixed, SignalEventPct
 from .order import OrderEvent
 from .fill import FillEvent, FillEventIB
@@ -7,6 +7,7 @@ from .fill import FillEvent, FillEventIB
 
 EVENT_MAP = {
 	'market': MarketEvent,
+	'market_batch': MarketEventBatch,
 	'order': OrderEvent,
 	'fill_ib': FillEventIB,
 	'signal_fixed': SignalEventFixed,
@@ -2,10 +2,14 @@ import pandas as pd
 
 from pandas import Timestamp
 from abc import abstractmethod
-from bson import ObjectId
 
 from pcm_backtest.conf import EXCHANGE_DICT, FILL, FILL_DICT
-from .core import Event
+from .core import Event, next_id, to_objectid, from_objectid
+
+
+# pre-bound lookups for decoding
+_exchange = EXCHANGE_DICT.__getitem__
+_fill_type = FILL_DICT.__getitem__
 
 
 
@@ -40,7 +44,7 @@ class FillEvent(Event):
 		commission: An optional commission
 		"""
 		self.order_id = order_id
-		self.id = ObjectId() if id is None else id
+		self.id = next_id() if id is None else id
 		self.symbol = symbol
 		self.exchange = exchange
 		self.quantity = int(quantity)
@@ -76,7 +80,7 @@ class FillEvent(Event):
 
 	@property
 	def timestamp(self):
-		return pd.Timestamp(self.id.generation_time)
+		return pd.Timestamp(self.id >> 32, unit='s', tz='UTC')
 
 
 	@abstractmethod
@@ -86,6 +90,8 @@ class FillEvent(Event):
 
 
 class FillEventIB(FillEvent):
+	__slots__ = ()
+
 	def calculate_commission(self):
 		"""
 		Calculate the fees of trading based on Interactive Brokers
@@ -111,8 +117,8 @@ class FillEventIB(FillEvent):
 		return {
 			'event_type': 'fill_ib',
 			'data': {
-				'id': str(self.id),
-				'order_id': str(self.order_id),
+				'id': str(to_objectid(self.id)),
+				'order_id': str(to_objectid(self.order_id)),
 				'symbol': self.symbol,
 				'exchange': self.exchange.value[0].upper(),
 				'quantity': self.quantity,
@@ -125,13 +131,19 @@ class FillEventIB(FillEvent):
 	
 	@classmethod
 	def from_dict(cls, **kws):
+		return cls.from_dict_raw(kws)
+
+
+	@classmethod
+	def from_dict_raw(cls, data):
+		get = data.get
 		return cls(
-			id=ObjectId(kws.get('id')),
-			order_id=ObjectId(kws.get('order_id')),
-			symbol=kws.get('symbol'),
-			exchange=EXCHANGE_DICT[kws.get('exchange')],
-			quantity=int(kws.get('quantity')),
-			fill_type=FILL_DICT[kws.get('fill_type')],
-			fill_cost=kws.get('fill_cost'),
-			commission=kws.get('commission'),
+			id=from_objectid(get('id')),
+			order_id=from_objectid(get('order_id')),
+			symbol=get('symbol'),
+			exchange=_exchange(get('exchange')),
+			quantity=int(get('quantity')),
+			fill_type=_fill_type(get('fill_type')),
+			fill_cost=get('fill_cost'),
+			commission=get('commission'),
 		)
@@ -1,5 +1,8 @@
-from pandas import Timestamp, DateOffset
-from collections import namedtuple, UserDict
+import numpy as np, orjson
+
+from pandas import Timestamp, Timedelta
+from collections import namedtuple
+from collections.abc import Mapping
 from datetime import time
 
 from pcm_backtest.conf import MARKET, GLOBAL_TZ, LOCAL_TZ, RTH_CLOSE
@@ -7,30 +10,61 @@ from .core import Event
 
 
 FRIDAY = 4
+ONE_SEC = Timedelta(seconds=1)
 Tick = namedtuple(
 	'Tick',
 	['timestamp','open','close','high','low','volume']
 )
 
 
-class MarketEvent(Event, UserDict):
+class MarketEvent(Event, Mapping):
 	"""
 	Handles the event of receiving new market update
 	with correspoding bars
+
+	- Read-only mapping of {symbol: Tick}, internal callers
+		should go to `data` directly to skip the forwarding
 	"""
-	__slots__ = ['data','timestamp']
+	__slots__ = ['data','timestamp','_local_ts','_time']
 	type = MARKET
 
 	def __init__(self, data):
 		self.data = data
-		self.timestamp = data[tuple(data.keys())[0]].timestamp
+		self.timestamp = next(iter(data.values())).timestamp
+
+		# cached on first access, tz conversion is slow
+		self._local_ts = None
+		self._time = None
+
+
+	def __getitem__(self, symbol):
+		return self.data[symbol]
+
+
+	def __iter__(self):
+		return iter(self.data)
+
+
+	def __len__(self):
+		return len(self.data)
+
+
+	def __contains__(self, symbol):
+		return symbol in self.data
+
+
+	def __eq__(self, other):
+		if isinstance(other, MarketEvent):
+			other = other.data
+		return self.data == other
 
 
 	def as_dict(self):
+		# timestamps go as int nanoseconds in UTC, no string round trip
 		data = {}
 		for k, v in self.data.items():
 			tmp = list(v)
-			tmp[0] = tmp[0].isoformat()
+			tmp[0] = tmp[0].value
 			data[k] = tmp
 
 		return {
@@ -39,28 +73,91 @@ class MarketEvent(Event, UserDict):
 		}
 	
 
+	@classmethod
+	def as_dict_batched(cls, evts):
+		"""Columnar `as_dict` of many market events in one payload
+		- one row per (event, symbol), `event` is the position in `evts`
+		- each Tick field becomes a numpy column, timestamps as int nanoseconds
+		"""
+		event, symbol, ticks = [], [], []
+		for i, evt in enumerate(evts):
+			for k, v in evt.data.items():
+				event.append(i)
+				symbol.append(k)
+				ticks.append(v)
+
+		n = len(ticks)
+		data = {
+			'event': np.array(event, dtype=np.int64),
+			'symbol': symbol,
+			'timestamp': np.fromiter(
+				(t.timestamp.value for t in ticks), dtype=np.int64, count=n
+			),
+		}
+		for j, field in enumerate(Tick._fields[1:], 1):
+			data[field] = np.array([t[j] for t in ticks])
+
+		return {
+			'event_type': MarketEventBatch.event_type,
+			'data': data,
+		}
+
+
+	@classmethod
+	def from_dict_batched(cls, data):
+		"""Inverse of `as_dict_batched`, takes its `data` dict
+
+		Return:
+		-------
+		list of MarketEvent, in the original order
+		"""
+		evts = []
+		last = None
+		rows = zip(
+			data['event'], data['symbol'],
+			*(data[field] for field in Tick._fields)
+		)
+		for i, symbol, timestamp, *bar in rows:
+			if i != last:
+				last = i
+				ticks = {}
+				evts.append(ticks)
+			ticks[symbol] = Tick(Timestamp(timestamp), *bar)
+
+		return [cls(ticks) for ticks in evts]
+
+
 	@classmethod
 	def from_dict(cls, **kws):
+		return cls.from_dict_raw(kws)
+
+
+	@classmethod
+	def from_dict_raw(cls, raw):
 		data = {}
-		for k,v in kws.items():
-			v[0] = Timestamp(v[0])
-			data[k] = Tick(*v)
+		for k,v in raw.items():
+			data[k] = Tick(Timestamp(v[0]), *v[1:])
 		return cls(data=data)
 
 	
 	@property
 	def local_ts(self):
-		try:
-			ts = self.timestamp.tz_localize(GLOBAL_TZ).tz_convert(LOCAL_TZ)
-		except:  # already have tz
-			ts = self.timestamp.tz_convert(LOCAL_TZ)
+		if self._local_ts is None:
+			ts = self.timestamp
+			if ts.tz is None:
+				ts = ts.tz_localize(GLOBAL_TZ)
 
-		return ts + DateOffset(seconds=1)
+			self._local_ts = ts.tz_convert(LOCAL_TZ) + ONE_SEC
+
+		return self._local_ts
 
 
 	@property
 	def time(self):
-		return self.local_ts.time()
+		if self._time is None:
+			self._time = self.local_ts.time()
+
+		return self._time
 
 
 	@property
@@ -71,3 +168,27 @@ class MarketEvent(Event, UserDict):
 	@property
 	def end_of_week(self):
 		return self.end_of_day and self.local_ts.dayofweek >= FRIDAY
+
+
+
+class MarketEventBatch:
+	"""Decoder of `MarketEvent.as_dict_batched` payloads
+	- registered as 'market_batch', so the generic decoders take them
+	- decodes to a list of MarketEvent rather than one event
+	"""
+	__slots__ = ()
+	event_type = 'market_batch'
+
+	@classmethod
+	def from_dict(cls, **kws):
+		return MarketEvent.from_dict_batched(kws)
+
+
+	@classmethod
+	def from_dict_raw(cls, data):
+		return MarketEvent.from_dict_batched(data)
+
+
+	@classmethod
+	def from_json(cls, string):
+		return MarketEvent.from_dict_batched(orjson.loads(string)['data'])
@@ -1,10 +1,14 @@
 import pandas as pd
 
 from pandas import Timestamp
-from bson import ObjectId
 
 from pcm_backtest.conf import ORDER, ORDER_DICT, FILL_DICT
-from .core import Event
+from .core import Event, next_id, to_objectid, from_objectid
+
+
+# pre-bound lookups for decoding
+_order_type = ORDER_DICT.__getitem__
+_direction = FILL_DICT.__getitem__
 
 
 
@@ -26,14 +30,14 @@ class OrderEvent(Event):
 
 		Parameter
 		---------
-		id (ObjectId): unique identifier of the order
+		id (int): unique identifier of the order
 		symbol: The instructment to trade
 		timestamp: The timestamp at which the order is placed
 		order_type: 'MKT' or 'LMT'
 		quantity: Non-negative Integer for quantity
 		direction: 'BUY' or 'SELL' for long or short
 		"""
-		self.id = ObjectId() if id is None else id
+		self.id = next_id() if id is None else id
 		self.symbol = symbol
 		self.order_type = order_type
 		self.quantity = quantity
@@ -62,14 +66,14 @@ class OrderEvent(Event):
 
 	@property
 	def timestamp(self):
-		return pd.Timestamp(self.id.generation_time)
+		return pd.Timestamp(self.id >> 32, unit='s', tz='UTC')
 
 
 	def as_dict(self):
 		return {
 			'event_type': 'order',
 			'data': {
-				'id': str(self.id),
+				'id': str(to_objectid(self.id)),
 				'symbol': self.symbol,
 				'order_type': self.order_type.value[0].upper(),
 				'quantity': self.quantity,
@@ -80,10 +84,16 @@ class OrderEvent(Event):
 	
 	@classmethod
 	def from_dict(cls, **kws):
+		return cls.from_dict_raw(kws)
+
+
+	@classmethod
+	def from_dict_raw(cls, data):
+		get = data.get
 		return cls(
-			id=ObjectId(kws.get('id')),
-			symbol=kws.get('symbol'),
-			order_type=ORDER_DICT[kws.get('order_type')],
-			quantity=kws.get('quantity'),
-			direction=FILL_DICT[kws.get('direction')],
+			id=from_objectid(get('id')),
+			symbol=get('symbol'),
+			order_type=_order_type(get('order_type')),
+			quantity=get('quantity'),
+			direction=_direction(get('direction')),
 		)
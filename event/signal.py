@@ -2,10 +2,9 @@ import pandas as pd
 
 from math import floor
 from pandas import Timestamp
-from bson import ObjectId
 
 from pcm_backtest.conf import SIGNAL, SIGNAL_DICT
-from .core import Event
+from .core import Event, next_id, to_objectid, from_objectid
 
 
 
@@ -27,7 +26,7 @@ class SignalEventFixed(Event):
 		strength: float, default=1
 			bound with in 0 to positive infinity
 		"""
-		self.id = ObjectId() if id is None else id
+		self.id = next_id() if id is None else id
 		self.symbol = symbol
 		self.signal_type = signal_type
 		self.strength = strength
@@ -51,7 +50,7 @@ class SignalEventFixed(Event):
 
 	@property
 	def timestamp(self):
-		return pd.Timestamp(self.id.generation_time)
+		return pd.Timestamp(self.id >> 32, unit='s', tz='UTC')
 
 
 	def target_qty(self, price, equity):
@@ -62,7 +61,7 @@ class SignalEventFixed(Event):
 		return {
 			'event_type': self.event_type,
 			'data': {
-				'id': str(self.id),
+				'id': str(to_objectid(self.id)),
 				'symbol': self.symbol,
 				'signal_type': self.signal_type.value[0].upper(),
 				'strength': self.strength
@@ -72,11 +71,17 @@ class SignalEventFixed(Event):
 	
 	@classmethod
 	def from_dict(cls, **kws):
+		return cls.from_dict_raw(kws)
+
+
+	@classmethod
+	def from_dict_raw(cls, data):
+		get = data.get
 		return cls(
-			id=ObjectId(kws.get('id')),
-			symbol=kws.get('symbol'),
-			signal_type=SIGNAL_DICT[kws.get('signal_type')],
-			strength=kws.get('strength'),
+			id=from_objectid(get('id')),
+			symbol=get('symbol'),
+			signal_type=SIGNAL_DICT[get('signal_type')],
+			strength=get('strength'),
 		)
 
 
@@ -84,6 +89,7 @@ class SignalEventPct(SignalEventFixed):
 	"""
 	Expected Strength = % of Portfolio / Market Price 
 	"""
+	__slots__ = ()
 	event_type = 'signal_pct'
 
 	def target_qty(self, price, equity):
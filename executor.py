@@ -2,10 +2,9 @@ import logging, time, numpy as np
 
 from bson import ObjectId
 from math import floor
-from collections import defaultdict, OrderedDict, deque
 from blinker import ANY
 
-from .base import BaseConsumer
+from .base import BaseConsumer, SELF
 from .conf import SMART
 from .event import FillEventIB
 
@@ -23,21 +22,20 @@ class Executor(BaseConsumer):
 	- Build in Order Book that track fillings at Strategy Level
 	- Simulated Slippage Model and Price Impact Estimation
 	"""
+	_subs = (
+		('reg-exe', ANY, 'on_reg'),
+		('dereg-exe', ANY, 'on_dereg'),
+		('ack-reg-feed', SELF, 'on_ack_reg_feed'),
+		('order', ANY, 'on_order'),
+		('tick', ANY, 'on_market'),
+		('ticks', ANY, 'on_markets'),
+	)
+
 	def __init__(self):
 		self.books = {}
 		super().__init__(comp_type='EXE', required=['feed'])
 
 
-	def subscriptions(self):
-		return [
-			('reg-exe', ANY, self.on_reg),
-			('dereg-exe', ANY, self.on_dereg),
-			('ack-reg-feed', self.id, self.on_ack_reg_feed),
-			('order', ANY, self.on_order),
-			('tick', ANY, self.on_market),
-		]
-
-
 	def on_reg(self, oid, body):
 		"""Handler for `reg-exe` event
 
@@ -77,7 +75,14 @@ class Executor(BaseConsumer):
 
 
 	def on_market(self, stgy_oid, body):
-		self.books[stgy_oid].on_market(body['ticks'])
+		self.books[stgy_oid].on_market(body['ticks'].data)
+
+
+	def on_markets(self, stgy_oid, body):
+		"""Handler for `ticks` event, a batch of bars in time order"""
+		book = self.books[stgy_oid]
+		for market in body['ticks']:
+			book.on_market(market.data)
 
 
 	def on_order(self, stgy_oid, body):
@@ -85,44 +90,66 @@ class Executor(BaseConsumer):
 
 
 
+# filling status of the order rows in SimuBook
+SUBMITTED, FILLING, FILLED = 0, 1, 2
+
+
+
 class SimuBook:
 	"""Simulated Order Book for one specific Strategy
 
 	- In backtesting environment, we would like to separeate
 		the impact from different strategies to isolate the evaluation
-	- 
+	- Outstanding orders are kept as parallel columns, one row per order
+		in arrival order, filled rows are dropped after each bar
+	- Arrivals are buffered and appended to the columns once per bar
 	"""
 	__slots__ = [
-		'app', 'stgy_oid', 'orders',
-		'fillings', 'ticks', 'filled_counter',
+		'app', 'stgy_oid', 'ticks', 'symbols',
+		'orders', 'rows', 'open_qty', 'status', 'sym', 'direction',
+		'_arrivals',
 	]
 	
 	def __init__(self, app, stgy_oid):
 		self.app = app
 		self.stgy_oid = stgy_oid
-		self.orders = deque()  # need to append back to the head
-		self.fillings = OrderedDict()  # keep the order orders
 		self.ticks = None
 
-		# counter to make sure multiple orders same symbol siutation
-		self.filled_counter = defaultdict(int)
+		# integer key of symbols, to group multiple orders on same symbol
+		self.symbols = {}
+
+		# filling books, columns share the same row for one order
+		self.orders = []  # Order events, keep the order orders
+		self.rows = {}  # {order id: row}
+		self.open_qty = np.zeros(0, dtype=np.int64)
+		self.status = np.zeros(0, dtype=np.int8)
+		self.sym = np.zeros(0, dtype=np.int64)
+		self.direction = np.zeros(0, dtype=np.int64)
+
+		# (quantity, symbol key, direction) of orders not in the columns yet
+		self._arrivals = []
+
+
+	def symbol_index(self, symbol):
+		"""Integer key of the symbol, added on first sight"""
+		return self.symbols.setdefault(symbol, len(self.symbols))
 
 
 	def on_order(self, order):
 		"""Handler for `order.stgy_name` event
 
 		- Add new arrivals to filling books
-		- Then put them to queue waiting to be executed
+		- They are going to be executed from next bar
 		"""
-		if order.id not in self.fillings:
-			self.fillings[order.id] = {
-				'order': order, 'fills': [],
-				'open_quantity': order.quantity,
-				'status': 'SUBMITTED'
-			}
+		if order.id not in self.rows:
+			self.rows[order.id] = len(self.orders)
+			self.orders.append(order)
+			self._arrivals.append((
+				order.quantity, self.symbol_index(order.symbol),
+				order.direction.value,
+			))
 		
-		logger.info('Got Order={} from Strategy={}'.format(order.id, self.stgy_oid))
-		self.orders.append(order.id)
+		logger.info('Got Order=%s from Strategy=%s', order.id, self.stgy_oid)
 
 
 	def on_market(self, ticks):
@@ -130,80 +157,162 @@ class SimuBook:
 		
 		- Try to fill as much as we can
 		- It not filled, we postpone them to next bars
+		- Publish all the fills of this bar in one go
 		- Then request next bar data to fill more
 		"""
 		self.ticks = ticks
+		if self._arrivals:
+			self.add_arrivals()
 
 		# filling order when new tickk arrives
-		while True:
-			try:
-				oid = self.orders.popleft()
-				order = self.fillings[oid]['order']
-
-				self.fillings[oid]['status'] = 'FILLING'
-				self.place_order(order)
-			except IndexError:
-				break
-
-		# requeue back not filled orders and record filled ones
-		# We don't do it along with filling
-		# to postpone the not fully filled orders to next bars
-		for oid in list(self.fillings.keys()):
-			if self.fillings[oid]['status'] != 'FILLED':
-				self.orders.append(oid)
-			else:
-				transact = self.fillings.pop(oid)
-			
-		# reset counter
-		self.filled_counter.clear()
+		if len(self.orders) == 1:
+			fills = self.place_order(0)
+		elif self.orders:
+			fills = self.place_orders()
+		else:
+			fills = None
+
+		if fills:
+			self.app.basic_publish('fills', sender=self.stgy_oid, fills=fills)
+			self.drop_filled()
 		
 		# request new bar data
 		# self.app.basic_publish('next', sender=self.stgy_oid)
 
 
-	def place_order(self, order):
-		"""Place the Order, simple
-
-		- First we need to get the outstanding quantity for this order
-		- Estimate the filled quantity and price impacts
-		- Update the filling book
-		- Then we publish Fill event & Simu-Impact Event
+	def add_arrivals(self):
+		"""Append the orders arrived since last bar to the columns
+		- one concatenate per column per bar, not one copy per order
 		"""
-		symbol, oid = order.symbol, order.id
-		tick = self.ticks[symbol]
+		quantity, sym, direction = zip(*self._arrivals)
+		n = len(quantity)
+		self._arrivals = []
+
+		self.open_qty = np.concatenate([
+			self.open_qty, np.array(quantity, dtype=np.int64)
+		])
+		self.status = np.concatenate([
+			self.status, np.full(n, SUBMITTED, dtype=np.int8)
+		])
+		self.sym = np.concatenate([self.sym, np.array(sym, dtype=np.int64)])
+		self.direction = np.concatenate([
+			self.direction, np.array(direction, dtype=np.int64)
+		])
+
+
+	def drop_filled(self):
+		"""Drop filled orders and keep the rest for next bars
+
+		- We don't do it along with filling
+			to postpone the not fully filled orders to next bars
+		- Only orders got fills can be done, so nothing to do without fills
+		"""
+		keep = np.flatnonzero(self.status != FILLED)
+		if keep.size < len(self.orders):
+			self.orders = [self.orders[k] for k in keep]
+			self.rows = {order.id: k for k, order in enumerate(self.orders)}
+			self.open_qty = self.open_qty[keep]
+			self.status = self.status[keep]
+			self.sym = self.sym[keep]
+			self.direction = self.direction[keep]
+
 
-		open_q = self.fillings[oid]['open_quantity']
+	def place_order(self, k):
+		"""Place the Order on row `k`, scalar version of `place_orders`
+
+		- Most bars only have one order queued, there the scalar kernel
+			is way cheaper than setting up the arrays
+		"""
+		tick = self.ticks[self.orders[k].symbol]
+		self.status[k] = FILLING
 
 		# get filled and simulated volume share impacts
 		filled, impacted_price = slippage(
 			# use mid-price for mimic wap price for fillings
 			(tick.high+tick.low+tick.close)/3,
-			tick.volume, open_q, order.direction.value,
-			filled_volume=max(0, self.filled_counter[symbol]),
+			tick.volume, int(self.open_qty[k]), int(self.direction[k]),
 		)
-		self.filled_counter[symbol] += filled
-		
 		if filled:
-			# update filling books
-			open_q -= filled
-			if open_q == 0:
-				self.fillings[oid]['status'] = 'FILLED'
-			
-			self.fillings[oid]['open_quantity'] = open_q
+			return [self.fill_order(k, filled, impacted_price)]
+		return []
 
-			# create fill events:
-			fill_event = FillEventIB(
-				order_id=oid, symbol=symbol, exchange=SMART, quantity=filled,
-				fill_type=order.direction, fill_cost=impacted_price
-			)
-			self.fillings[oid]['fills'].append(fill_event)
 
-			# publish fill events
-			logger.info(
-				'Publish Fill for Q={} Open={} for Order={}'
-				.format(fill_event.quantity, open_q, oid)
-			)
-			self.app.basic_publish('fill', sender=self.stgy_oid, fill=fill_event)
+	def place_orders(self):
+		"""Place all the outstanding Orders on the current bar at once
+
+		- First we gather the bar data once per traded symbol
+		- Estimate the filled quantity and price impacts for all of them
+			orders on the same symbol take turns, so later ones only get
+			the volume left by the earlier ones
+		- Then update the filling books and create Fill events
+		"""
+		n = len(self.orders)
+		sym, open_q = self.sym, self.open_qty
+
+		# look up each symbol's tick once, then spread it to its orders
+		_, first, inverse = np.unique(
+			sym, return_index=True, return_inverse=True
+		)
+		ticks = [self.ticks[self.orders[k].symbol] for k in first]
+
+		# use mid-price for mimic wap price for fillings
+		price = np.fromiter(
+			((t.high+t.low+t.close)/3 for t in ticks),
+			dtype=np.float64, count=len(ticks)
+		)[inverse]
+		volume = np.fromiter(
+			(t.volume for t in ticks), dtype=np.float64, count=len(ticks)
+		)[inverse]
+
+		# quantity queued ahead of each order on the same symbol
+		ranked = np.argsort(sym, kind='stable')
+		sorted_sym = sym[ranked]
+		is_first = np.r_[True, sorted_sym[1:] != sorted_sym[:-1]]
+		ahead = np.cumsum(open_q[ranked]) - open_q[ranked]
+		ahead -= ahead[is_first][np.cumsum(is_first) - 1]
+		queued = np.empty(n, dtype=np.int64)
+		queued[ranked] = ahead
+
+		# orders ahead fill greedily up to the tradable volume of the bar
+		# so this is the volume they took as if filled one after another
+		filled_volume = np.minimum(queued, np.floor(SLIPPAGE_LIMIT * volume))
+
+		# get filled and simulated volume share impacts
+		filled, impacted_price = slippage_vec(
+			price, volume, open_q, self.direction, filled_volume=filled_volume
+		)
+
+		self.status[:] = FILLING
+		return [
+			self.fill_order(k, int(filled[k]), float(impacted_price[k]))
+			for k in np.flatnonzero(filled)
+		]
+
+
+	def fill_order(self, k, filled, impacted_price):
+		"""Update the filling book on row `k` and create the Fill event"""
+		order = self.orders[k]
+		oid = order.id
+
+		# update filling books
+		open_q = int(self.open_qty[k]) - filled
+		if open_q == 0:
+			self.status[k] = FILLED
+		
+		self.open_qty[k] = open_q
+
+		# create fill events:
+		fill_event = FillEventIB(
+			order_id=oid, symbol=order.symbol, exchange=SMART,
+			quantity=filled, fill_type=order.direction,
+			fill_cost=impacted_price
+		)
+
+		logger.info(
+			'Publish Fill for Q=%s Open=%s for Order=%s',
+			fill_event.quantity, open_q, oid
+		)
+		return fill_event
 
 
 
@@ -255,4 +364,37 @@ def slippage(
 
 	share = min(filled/bar_volume, slippage_limit)
 	impact = direction * max(min_impact, share ** 2 * impact_coef * price)
-	return filled, round(impact + price, 3)
+	# round on mils, integer rounding is way cheaper than round(x, 3)
+	return filled, round((impact + price) * 1000) / 1000
+
+
+def slippage_vec(
+	price, bar_volume, open_quantity, direction,
+	filled_volume=0, slippage_limit=SLIPPAGE_LIMIT,
+	min_impact=MIN_IMPACT, impact_coef=PRICE_IMPACT_COEF
+):
+	"""Vectorized version of `slippage`, one element per order
+
+	Parameter:
+	----------
+	Same as `slippage`, each one can be either a scalar or an array
+
+	Return:
+	-------
+	Hypothestical Filled Quanitty (int array)
+	Simulated Impacted Price (float array), 0 for bars without volume
+	"""
+	price = np.asarray(price, dtype=np.float64)
+	bar_volume = np.asarray(bar_volume, dtype=np.float64)
+	has_volume = bar_volume > 0
+	bar_volume = np.where(has_volume, bar_volume, 1)  # no divide by zero
+
+	filled = np.where(has_volume, np.floor(np.minimum(
+		open_quantity,
+		np.maximum(0, slippage_limit * bar_volume - filled_volume)
+	)), 0)
+
+	share = np.minimum(filled/bar_volume, slippage_limit)
+	impact = direction * np.maximum(min_impact, share ** 2 * impact_coef * price)
+	impacted = np.where(has_volume, np.rint((impact + price) * 1000) / 1000, 0)
+	return filled.astype(np.int64), impacted
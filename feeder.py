@@ -11,12 +11,46 @@ from blinker import ANY
 from . import conf as CONF
 from .conf import DEFAULT_FREQ
 from .base import BaseConsumer
+from .util import thread_pool
 from .event import MarketEvent, Tick
 from pcm_pipe.backtest import TickerPipeline
 from pcm_pipe.conn import BacktestDB
 
 logger = logging.getLogger('Feeder')
 
+# column order of the bars read from data pipeline, same as `Tick`
+BAR_COLUMNS = ['open', 'close', 'high', 'low', 'volume']
+PRICE_COLUMNS = BAR_COLUMNS[:4]
+
+# max number of executor only bars published at once
+TICKS_BATCH_SIZE = 256
+
+# period of bars read from database at once for each ticker
+READ_WINDOW = pd.Timedelta(days=30)
+ONE_SEC = pd.Timedelta(seconds=1)
+
+# {ticker_id: (start, end)} avaliable historical period, shared by DataBooks
+_periods = {}
+
+
+@lru_cache(maxsize=4096)
+def pipeline_for(ticker_id):
+	"""Data pipeline of the ticker, shared by all DataBooks"""
+	return TickerPipeline(ticker_id)
+
+
+def read_warmup(pipe, start, end):
+	"""Warmup bars of one ticker, indexed by (timestamp, symbol)
+
+	- Each call has its own session, so tickers can be read concurrently
+	"""
+	with BacktestDB.session_scope() as sess:
+		chunk = pipe.get_data(sess, start, end)
+
+	# then here we adjust for enough bars to warmup
+	chunk['symbol'] = pipe.ticker_id
+	return chunk.sort_values('timestamp').set_index(['timestamp', 'symbol'])
+
 
 
 class Feeder(BaseConsumer):
@@ -26,18 +60,16 @@ class Feeder(BaseConsumer):
 	The goal of a (derived) DataHandler object is to output a generated
 	set of bars (OLHCVI) for each symbol requested
 	"""
+	_subs = (
+		('reg-feed', ANY, 'on_reg'),
+		('dereg-feed', ANY, 'on_dereg'),
+		('warmup', ANY, 'on_warmup'),
+		('next', ANY, 'on_next'),
+	)
+
 	def __init__(self):
 		self.books = {}
 		super().__init__(comp_type='FEED', required=[])
-
-	
-	def subscriptions(self):
-		return [
-			('reg-feed', ANY, self.on_reg),
-			('dereg-feed', ANY, self.on_dereg),
-			('warmup', ANY, self.on_warmup),
-			('next', ANY, self.on_next),
-		]
 		
 
 	def on_reg(self, oid, body):
@@ -80,21 +112,27 @@ class DataBook:
 	def __init__(self, app, stgy_oid):
 		self.app = app
 		self.stgy_oid = stgy_oid
-		self.bars = defaultdict(list)
+		self.bars = defaultdict(BarBuffer)
 		self.counter = Counter()
 		self.start_time = None
 
-		self.get_stgy_info()
-		self.read_data()
+		# executor only bars waiting to be published in one batch
+		self.pending = []
+
+		# one session for all the queries of setting up
+		with BacktestDB.session_scope() as sess:
+			self.get_stgy_info(sess)
+			self.read_data(sess)
 
 
-	def get_avaliable_period(self, start, end):
+	def get_avaliable_period(self, sess, start, end):
 		"""With given Starting and Ending datetime from Strategy
 		- need to figure about the actural avaliable start and end
 		- It will need to consider all provided symbols
 		
 		Parameter:
 		----------
+		sess: Database session
 		start (datetime): The desired starting date
 		end (datetime): The desired ending date
 
@@ -103,18 +141,21 @@ class DataBook:
 		The actual avaliable: start (Timestamp), end (Timestamp)
 		"""
 		# for each symbol we want avalaible historical date range
-		with BacktestDB.session_scope() as sess:
-			for pipe in self.pipes:
-				s_start, s_end = pipe.avaliable_period(sess=sess)
+		for pipe in self.pipes:
+			try:
+				s_start, s_end = _periods[pipe.ticker_id]
+			except KeyError:
+				s_start, s_end = _periods[pipe.ticker_id] = \
+					pipe.avaliable_period(sess=sess)
 
-				# get the period that all symbols have data avaliable
-				start = max(s_start, start)
-				end = min(s_end, end)
+			# get the period that all symbols have data avaliable
+			start = max(s_start, start)
+			end = min(s_end, end)
 
 		return start, end
 
 
-	def get_stgy_info(self):
+	def get_stgy_info(self, sess):
 		"""Upon creating the DataBook, we need information from the strategy
 		- The frequency of data that the strategy is looking for
 		- how long the wamrup period would be
@@ -125,47 +166,46 @@ class DataBook:
 
 		self.freq = stgy.freq
 		self.symbol_list = stgy.symbol_list
-		self.pipes = [TickerPipeline(t) for t in self.symbol_list]
+		self.pipes = [pipeline_for(t) for t in self.symbol_list]
 		self.warmup = stgy.warmup
 
 		# get number of bars to aggregate for Strategy data
 		# if its 1 -> then Exe and Strategy uses same frequency
 		self.num_agg = int(DEFAULT_FREQ.one_day / self.freq.one_day)
 
+		# time span after the first bar that triggers an aggregated bar
+		self._need_agg_delta = self.freq.offset - DEFAULT_FREQ.offset
+
 		# get the real start end range, diff symbol have diff avaliability
-		self.start, self.end = self.get_avaliable_period(stgy.start_dt, stgy.end_dt)
+		self.start, self.end = self.get_avaliable_period(
+			sess, stgy.start_dt, stgy.end_dt
+		)
 		
 
-	def read_data(self):
+	def read_data(self, sess):
 		"""Create mongo query to read in data stream for each symbols
 		- It uses `Contract` ORM's function to read in bars with agg features
+		- Bars are read window by window, see `BarStream`
 		"""
-		with BacktestDB.session_scope() as sess:
-			stream = {}
-			for pipe in self.pipes:
-				data = pipe.get_data(sess=sess, start=self.start, end=self.end)
-				stream[pipe.ticker_id] = data.itertuples()
-			self.stream = stream
+		stream = {}
+		for pipe in self.pipes:
+			bars = BarStream(pipe, self.start, self.end)
+			bars.load(sess)
+			stream[pipe.ticker_id] = bars
+		self.stream = stream
 
 
 	def get_new_market(self):
+		# bound once per bar instead of once per symbol
+		stream, bars = self.stream, self.bars
+
 		data = {}
 		for symbol in self.symbol_list:
-			bar = next(self.stream[symbol])
-
-			tick = Tick(
-				timestamp=bar.Index,
-				open=float(bar.open),
-				close=float(bar.close),
-				high=float(bar.high),
-				low=float(bar.low),
-				volume=int(bar.volume),
-				# trades=int(bar.trades),
-				# wap=float(bar.wap),
-			)
+			timestamp, (open, close, high, low), volume = next(stream[symbol])
 
-			data[symbol] = tick
-			self.bars[symbol].append(tick)
+			# positional, in `Tick` field order
+			data[symbol] = tick = Tick(timestamp, open, close, high, low, volume)
+			bars[symbol].append(tick)
 		return MarketEvent(data=data)
 
 
@@ -198,7 +238,18 @@ class DataBook:
 				using next bar, not this one
 
 			- When the data feed ends, make sure publish EOD Event
+
+			- bars only the executor needs (strategy on a lower frequency)
+				are published in batches, always flushed before the
+				strategy gets its next bar
 		"""
+		# bound once, they are used on every bar
+		get_new_market = self.get_new_market
+		publish = self.app.basic_publish
+		stgy_oid = self.stgy_oid
+		default_freq = DEFAULT_FREQ
+		aggregate = self.num_agg != 1
+
 		while True:
 			end = False
 
@@ -206,42 +257,52 @@ class DataBook:
 				try:
 					# fire market event for the executor first
 					# filling the old orders first
-					market = self.get_new_market()
-					# logger.info(
-					# 	'Publish Tick at Freq={} for Strategy={}'
-					# 	.format(DEFAULT_FREQ, self.stgy_oid)
-					# )
-					self.app.basic_publish(
-						'tick', sender=self.stgy_oid,
-						ticks=market, freq=DEFAULT_FREQ
-					)
+					market = get_new_market()
 
 				except StopIteration:
 					# no more data, send out End-Of-Data Event
+					self.flush_ticks()
 					logger.info('Publish End-Of-Data')
-					self.app.basic_publish('eod', sender=self.stgy_oid)
+					publish('eod', sender=stgy_oid)
 					return
 
 				# check to see if we need to send out event for strategy
 				# if num_agg is 1, then feed to executor will always go to stgy too
-				if self.num_agg != 1:
+				if aggregate:
+					self.pending.append(market)
+					if len(self.pending) >= TICKS_BATCH_SIZE:
+						self.flush_ticks()
 					end = self.stgy_market(market, state='real')
 				else:
+					publish(
+						'tick', sender=stgy_oid,
+						ticks=market, freq=default_freq
+					)
 					end = True
 
 
+	def flush_ticks(self):
+		"""Publish the pending executor only bars in one `ticks` event"""
+		if self.pending:
+			self.app.basic_publish(
+				'ticks', sender=self.stgy_oid,
+				ticks=self.pending, freq=DEFAULT_FREQ
+			)
+			self.pending = []
+
+
 	def stgy_market(self, market, state='warmup'):
 		if self.start_time is None:
 			self.start_time = market.timestamp
 
-		need_agg = (
-			market.timestamp - self.start_time 
-			>= self.freq.offset - DEFAULT_FREQ.offset
-		)
+		need_agg = market.timestamp - self.start_time >= self._need_agg_delta
 		if need_agg or market.end_of_day:
+			# executor goes first on the bars up to now
+			self.flush_ticks()
+
 			market = MarketEvent(
 				data={
-					symbol: agg_bars(bars)
+					symbol: bars.agg()
 					for symbol, bars in self.bars.items()
 				}
 			)
@@ -284,19 +345,13 @@ class DataBook:
 		end = self.start - pd.DateOffset(seconds=1)
 		bar_size = DEFAULT_FREQ.bar_size
 
+		# queries are independent and waiting on database, run them together
+		futures = [
+			thread_pool().submit(read_warmup, pipe, start, end)
+			for pipe in self.pipes
+		]
 		try:
-			with BacktestDB.session_scope() as sess:
-				data = []
-				for pipe in self.pipes:
-					chunk = pipe.get_data(sess, start, end)
-					# then here we adjust for enough bars to warmup
-					chunk['symbol'] = pipe.ticker_id
-					chunk = (
-						chunk
-						.sort_values('timestamp')
-						.set_index(['timestamp', 'symbol'])
-					)
-					data.append(chunk)
+			data = [f.result() for f in futures]
 		except KeyError:  # no data at all, so can't find the column
 			return  # so we simply stop warming up
 
@@ -308,13 +363,21 @@ class DataBook:
 		)
 		data = pd.concat(data).unstack(level=1).dropna().tail(need_bars)
 
+		# position of each symbol's bar fields within a row, columns
+		# are (field, symbol) after unstacking
+		columns = data.columns
+		layout = [
+			(symbol, [columns.get_loc((field, symbol)) for field in BAR_COLUMNS])
+			for symbol in sorted(set(columns.get_level_values(1)))
+		]
+
 		# start publishing ticks to strategy for warming up
-		for ts, row in data.iterrows():
+		for ts, row in zip(data.index.tolist(), data.to_numpy().tolist()):
 			ticks = {}
-			for symbol, bar in row.swaplevel().groupby(level=0):
-			    tick = Tick(timestamp=ts, **bar[symbol])
-			    ticks[symbol] = tick
-			    self.bars[symbol].append(tick)
+			for symbol, (o, c, h, l, v) in layout:
+				tick = Tick(ts, row[o], row[c], row[h], row[l], row[v])
+				ticks[symbol] = tick
+				self.bars[symbol].append(tick)
 
 			market = MarketEvent(data=ticks)
 			self.stgy_market(market, state='warmup')
@@ -324,18 +387,94 @@ class DataBook:
 		self.start_time = None
 
 
+class BarBuffer:
+	"""Running aggregation of the bars of one symbol
+
+	- Each appended bar updates the aggregated bar in place
+		so aggregating never needs to go over the bars again
+	"""
+	__slots__ = ['timestamp', 'open', 'close', 'high', 'low', 'volume']
+
+	def __init__(self):
+		self.open = None
+
+
+	def append(self, tick):
+		if self.open is None:
+			self.open = tick.open
+			self.high = tick.high
+			self.low = tick.low
+			self.volume = tick.volume
+		else:
+			if tick.high > self.high: self.high = tick.high
+			if tick.low < self.low: self.low = tick.low
+			self.volume += tick.volume
+
+		self.timestamp = tick.timestamp
+		self.close = tick.close
+
+
+	def agg(self):
+		"""The aggregated bar as `Tick`"""
+		return Tick(
+			self.timestamp, self.open, self.close, self.high, self.low, self.volume
+		)
+
+
+class BarStream:
+	"""Bars of one ticker, read from database one window at a time
+
+	- Only `READ_WINDOW` of bars are held in memory
+	- Bars are unboxed once per window into plain lists,
+		prices as floats and volumes as ints
+	- Iterating gives (timestamp, [open, close, high, low], volume)
+	"""
+	__slots__ = ['pipe', 'start', 'end', 'timestamps', 'bars', 'volumes', 'i']
+
+	def __init__(self, pipe, start, end):
+		self.pipe = pipe
+		self.start = start  # start of the next window to read
+		self.end = end
+		self.timestamps = []
+		self.bars = []
+		self.volumes = []
+		self.i = 0
+
+
+	def load(self, sess):
+		"""Read the next window that has bars, False if nothing left"""
+		while self.start <= self.end:
+			end = min(self.start + READ_WINDOW - ONE_SEC, self.end)
+			data = self.pipe.get_data(sess=sess, start=self.start, end=end)
+			self.start = end + ONE_SEC
+
+			if len(data):
+				self.timestamps = data.index.tolist()
+				self.bars = data[PRICE_COLUMNS].to_numpy(dtype=np.float64).tolist()
+				self.volumes = data['volume'].to_numpy(dtype=np.int64).tolist()
+				self.i = 0
+				return True
+		return False
+
+
+	def __iter__(self):
+		return self
+
+
+	def __next__(self):
+		i = self.i
+		if i >= len(self.bars):
+			with BacktestDB.session_scope() as sess:
+				if not self.load(sess):
+					raise StopIteration
+			i = 0
+
+		self.i = i + 1
+		return self.timestamps[i], self.bars[i], self.volumes[i]
+
+
 def agg_bars(bars):
-	bars = np.asarray(bars)
-
-	timestamp = bars[-1, 0]  # 0 -> timestamp
-	open = bars[0, 1]  # 1 -> open
-	close = bars[-1, 2]  # 2 -> close
-	high = np.max(bars[:, 3])  # 3 -> high
-	low = np.min(bars[:, 4])  # 4 -> low
-	volume = np.sum(bars[:, 5])  # 5 -> volume
-
-	return Tick(
-		timestamp=timestamp,
-		open=open, close=close, high=high, low=low,
-		volume=volume,
-	)
+	buf = BarBuffer()
+	for tick in bars:
+		buf.append(tick)
+	return buf.agg()
@@ -14,9 +14,18 @@ def sharpe_ratio(returns, N=250):
 	N: number of period to measure
 		Daily (252), Hourly (252*6.5),  Minutely(252*6.5*60) etc.
 	"""
-	er = np.mean(returns)
+	er, std = _mean_std(returns, ddof=1)
 	rf = (Constant.Rf + 1) ** (1/N) - 1
-	return np.sqrt(N) * (er - rf) / np.std(returns, ddof=1)
+	return np.sqrt(N) * (er - rf) / std
+
+
+def _mean_std(returns, ddof=0):
+	# mean and standard deviation sharing the demeaned array,
+	# the squared sum is a dot product instead of a temporary square
+	x = np.asarray(returns, dtype=float)
+	mu = x.mean()
+	d = x - mu
+	return mu, np.sqrt((d @ d) / (x.shape[0] - ddof))
 
 
 def roy_safety_ratio(returns, target_returns, N=252):
@@ -45,12 +54,13 @@ def alpha_beta(returns, target_returns, N=252):
 	------
 	alpha, beta
 	"""
-	X = np.asarray(target_returns).reshape(-1, 1)
-	X = np.concatenate([np.ones(X.shape), X], axis=1)
-
-	y = np.asarray(returns).reshape(-1, 1)
+	# closed form of univariate OLS
+	x = np.asarray(target_returns, dtype=float)
+	y = np.asarray(returns, dtype=float)
 
-	alpha, beta = (np.linalg.pinv(X.T @ X) @ X.T @ y).flatten()
+	x_dm = x - x.mean()
+	beta = (x_dm @ (y - y.mean())) / (x_dm @ x_dm)
+	alpha = y.mean() - beta * x.mean()
 	alpha = (alpha+1)**N-1
 	return alpha, beta
 
@@ -70,6 +80,19 @@ def var_cov_var(P, c, mu, sigma):
 	return P - P * (alpha + 1)
 
 
+def var_cov_var_from_returns(P, c, returns):
+	"""`var_cov_var` with mean and standard deviation of the returns
+
+	Arugments
+	---------
+	P: portfolio dollars
+	c: confidence level, the tail percentage
+	returns: Series | Numpy Array
+	"""
+	mu, sigma = _mean_std(returns)
+	return var_cov_var(P, c, mu, sigma)
+
+
 def water_mark(pnl, how='high'):
 	"""Accumulative Maximum/Minimum of a Series
 
@@ -83,8 +106,15 @@ def water_mark(pnl, how='high'):
 	------
 	Series
 	"""
+	return pd.Series(_water_mark(np.asarray(pnl, dtype=float), how), index=pnl.index)
+
+
+def _water_mark(values, how='high'):
+	# numpy version of `water_mark`, missing values count as the minimum
 	mark = np.maximum if how == 'high' else np.minimum
-	return mark.accumulate(pnl.fillna(pnl.min()))
+	if np.isnan(values).any():
+		values = np.where(np.isnan(values), np.nanmin(values), values)
+	return mark.accumulate(values)
 
 
 def drawdown(pnl):
@@ -102,12 +132,20 @@ def drawdown(pnl):
 	------
 	drawdown
 	"""
-	dd = 1 - (pnl / water_mark(pnl, how='high').shift(1))
-	dd.ix[dd < 0] = 0
+	return pd.Series(_drawdown(np.asarray(pnl, dtype=float)), index=pnl.index)
+
+
+def _drawdown(values):
+	# numpy version of `drawdown`, against the high water mark
+	# up to the previous period
+	dd = np.empty_like(values)
+	dd[:1] = np.nan
+	dd[1:] = 1 - values[1:] / _water_mark(values, how='high')[:-1]
+	np.maximum(dd, 0, out=dd)  # keeps nan
 	return dd
 
 
-def drawdown_dur(pnl):
+def drawdown_dur(pnl, dd=None):
 	"""Accumulative Drawdown Duration
 
 	Parameter
@@ -115,6 +153,8 @@ def drawdown_dur(pnl):
 	pnl: Pandas Series 
 		- index of timestamp
 		- period percentagized returns
+	dd: Pandas Series, optional
+		- `drawdown(pnl)` if already calculated
 
 
 	Theory
@@ -123,16 +163,22 @@ def drawdown_dur(pnl):
 	2. Convert anything that is not 0 to 1 as boolean type
 	3. Then find periodic drawdown period
 		- by comparising on changing in boolean value
-		- cumsum to get a series that labeled with drawdown period
-	4. Group by each drawdown period using count size
+	4. Length of each period is the distance between its start and end
 
 	Rerturn
 	-------
-	Integer, maximum period of drawdown period length
+	Numpy Array, length of each drawdown period, [0] if never in drawdown
 	"""
 	# Get Drawdown Max Duration
-	sr = drawdown(pnl)[1:].astype(bool)
-	return sr.groupby((sr != sr.shift()).cumsum()).size()
+	if dd is None:
+		dd = _drawdown(np.asarray(pnl, dtype=float))
+	sr = np.asarray(dd)[1:].astype(bool)
+	if not sr.any():
+		return np.zeros(1, dtype=int)
+
+	# +1 where a drawdown period starts, -1 right after it ends
+	edges = np.diff(np.r_[False, sr, False].astype(np.int8))
+	return np.flatnonzero(edges == -1) - np.flatnonzero(edges == 1)
 
 
 def max_drawdown_dur(pnl):
@@ -140,7 +186,7 @@ def max_drawdown_dur(pnl):
 	return drawdown_dur(pnl).max()
 
 
-def max_drawdown(pnl):
+def max_drawdown(pnl, dd=None):
 	"""Max drawdown Percentage in the trading period
 
 	Parameter
@@ -148,12 +194,16 @@ def max_drawdown(pnl):
 	pnl: Pandas Series 
 		- index of timestamp
 		- period percentagized returns
+	dd: Pandas Series, optional
+		- `drawdown(pnl)` if already calculated
 
 	Rerturn
 	-------
 	FLoat, maximum drawdown percentage
 	"""
-	return drawdown(pnl).max()
+	if dd is None:
+		dd = _drawdown(np.asarray(pnl, dtype=float))
+	return np.nanmax(dd)
 
 
 def lpm(returns, threshold=0, order=2):
@@ -170,6 +220,20 @@ def hpm(returns, threshold=0, order=2):
 	return ((diff**order).sum() / diff.shape[0])**(1/order)
 
 
+def partial_moments(returns, threshold=0):
+	"""First and second lower and first higher partial moments at once
+
+	Return
+	------
+	lpm of order 1, lpm of order 2, hpm of order 1
+	"""
+	diff = np.asarray(returns) - threshold
+	n = diff.shape[0]
+	down = np.minimum(diff, 0)
+	lpm1 = -down.sum() / n
+	return lpm1, ((down @ down) / n)**0.5, diff.sum() / n + lpm1
+
+
 def omega_ratio(returns, target=0, N=250):
 	"""Excess Return per unit of Semi-Downside-Mean"""
 	er = np.mean(returns)
@@ -252,13 +316,13 @@ def bench_adj_return(alpha, beta, cagr):
 
 
 def sigmoid(x):
-	return 1 / (1 + np.e**(-1 * x))
+	return 1 / (1 + np.exp(-x))
 
 def tanh(x):
-    return (1-np.e**(-2*x)) / (1+np.e**(-2*x))
+	return np.tanh(x)
 
 
-def pcm_ratio(pnl, target=0, N=250):
+def pcm_ratio(pnl, target=0, N=250, returns=None, dd=None, dd_dur=None):
 	"""PCM Home Grown Risk Metrics
 	- The sigmoid normalized
 	- log of product between risk adjusted ratio and drawdown adjusted ratio
@@ -269,17 +333,28 @@ def pcm_ratio(pnl, target=0, N=250):
 	pnl: equity curve
 	target: target return / Min Acceptable Return, default=0
 	N: Number of unit in one Year
+	returns, dd, dd_dur: optional, periodic returns, `drawdown` and
+		`drawdown_dur` of the pnl if already calculated
 	"""
-	returns = pd.Series(pnl).pct_change().fillna(0)
-
-	sortino = sortino_ratio(returns, N=N, target=target)
-	gl = gain_loss_ratio(returns, target=target)
-	upside = upside_potential_ratio(returns, target=target)
+	if returns is None:
+		returns = pd.Series(pnl).pct_change()
+	returns = np.asarray(returns, dtype=float)
+	returns = np.where(np.isnan(returns), 0, returns)
 
-	max_dd = max_drawdown(pnl)
-	max_dd_dur = max_drawdown_dur(pnl)
-	avg_dd = drawdown(pnl).mean()
-	avg_dd_dur = drawdown_dur(pnl).mean()
+	# sortino, gain loss and upside potential ratio from one pass
+	lpm1, lpm2, hpm1 = partial_moments(returns, threshold=target)
+	rf = (Constant.Rf + 1) ** (1/N) - 1
+	sortino = (N**0.5) * (np.mean(returns) - rf) / lpm2
+	gl = hpm1 / lpm1
+	upside = hpm1 / lpm2
+
+	# drawdown and its duration are needed twice, calculate them once
+	if dd is None:
+		dd = drawdown(pnl)
+	if dd_dur is None:
+		dd_dur = drawdown_dur(pnl, dd=dd)
+	max_dd, avg_dd = np.nanmax(dd), np.nanmean(dd)
+	max_dd_dur, avg_dd_dur = np.max(dd_dur), np.mean(dd_dur)
 
 	risk_adj = risk_adj_ratio(gl, upside, sortino)
 	dd_adj = dd_adj_ratio(max_dd, max_dd_dur, avg_dd, avg_dd_dur, N=N)
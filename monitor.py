@@ -7,13 +7,32 @@ from cytoolz import pluck
 
 from .util import dollar_trunc
 from .metrics import (
-	drawdown, max_drawdown_dur, max_drawdown, drawdown_dur, sharpe_ratio,
+	drawdown, max_drawdown, drawdown_dur, sharpe_ratio,
 	roy_safety_ratio, alpha_beta, var_cov_var, sortino_ratio, omega_ratio,
 	gain_loss_ratio, upside_potential_ratio, pcm_ratio, bench_adj_return
 )
 
 logger = logging.getLogger('Monitor')
 
+# (label, format, scale) of each summary statistic, in report order
+SUMMARY_FORMATS = (
+	('Total Return', '%0.2f%%', 100),
+	('CAGR', '%0.2f%%', 100),
+	('Alpha', '%0.2f%%', 100),
+	('Beta', '%0.2f', 1),
+	('Benchmark Adjusted Return', '%0.2f%%', 100),
+
+	('Sharpe Ratio', '%0.2f', 1),
+	('Sortino Ratio', '%0.2f', 1),
+	('Gain Loss Ratio', '%0.2f', 1),
+	('Upside Potential Ratio', '%0.2f', 1),
+	('Max Drawdown', '%0.2f%%', 100),
+	('Max Drawdown Duration', '%0.2f days', 1),
+	('Avg Drawdown', '%0.2f%%', 100),
+	('Avg Drawdown Duration', '%0.2f days', 1),
+	('PCM Ratio', '%0.2f', 1),
+)
+
 
 
 class StaticMonitor:
@@ -21,15 +40,30 @@ class StaticMonitor:
 		self._stgy = stgy
 		self._benchmark = benchmark
 
+		# holdings snapshots kept column by column, one value per bar
+		self.all_holdings = {'datetime': [], 'total': [], 'buying_power': []}
+
+		# (curve, N, stats) of the last `output_summary_stats`, the curve
+		# is kept rather than its id, so a new curve never hits the cache
+		self._stats_cache = None
+
 		# palattets for the report
 		self._palatte = sns.xkcd_palette([
 			'windows blue','amber','magenta','teal','scarlet'
 		])
 
 
+	def record_holdings(self, datetime, total, buying_power):
+		"""Append one holdings snapshot to the 'all_holdings' columns"""
+		holdings = self.all_holdings
+		holdings['datetime'].append(datetime)
+		holdings['total'].append(total)
+		holdings['buying_power'].append(buying_power)
+
+
 	def create_curves(self):
 		"""Creates a pandas DataFrame from the 'all_holdings'
-		list of dictionaries
+		columns, built once without inferring keys row by row
 
 		Return
 		------
@@ -37,7 +71,13 @@ class StaticMonitor:
 		"""
 		curve = pd.DataFrame(self.all_holdings)
 		curve['returns'] = curve['total'].pct_change()
-		curve['equity_curve'] = (1 + curve['returns']).cumprod()
+
+		# compounding by summing log returns, missing returns stay missing
+		r = curve['returns'].to_numpy(dtype=float)
+		missing = np.isnan(r)
+		equity = np.exp(np.cumsum(np.log1p(np.where(missing, 0, r))))
+		equity[missing] = np.nan
+		curve['equity_curve'] = equity
 		curve['drawdown'] = drawdown(curve['equity_curve'])
 		self.equity_curve = curve[curve.datetime.notnull()].set_index('datetime')
 
@@ -64,6 +104,11 @@ class StaticMonitor:
 		"""
 		curve, ben = self._validate_equity_curve()
 
+		# same curve and N gives the same stats, e.g. re-rendering a report
+		cache = self._stats_cache
+		if cache is not None and cache[0] is curve and cache[1] == N:
+			return OrderedDict(cache[2])
+
 		total_return = curve['equity_curve'][-1]  # return to date
 		er = total_return ** (1/curve.shape[0]) - 1  # expected daily return
 		cagr = (1 + er) ** N - 1   # annualized return
@@ -78,25 +123,22 @@ class StaticMonitor:
 		sortino = sortino_ratio(er, returns, N=N, target=0)
 		gl = gain_loss_ratio(returns, target=0)
 		upside = upside_potential_ratio(returns, target=0)
-
-		stats = OrderedDict([
-			('Total Return', '%0.2f%%' % ((total_return-1)*100)),
-			('CAGR', '%0.2f%%' % (cagr*100)),
-			('Alpha', '%0.2f%%' % (alpha*100)),
-			('Beta', '%0.2f' % (beta)),
-			('Benchmark Adjusted Return', '%0.2f%%' % (bench_adj*100)),
-
-			('Sharpe Ratio', '%0.2f' % (sharpe)),
-			('Sortino Ratio', '%0.2f' % (sortino)),
-			('Gain Loss Ratio', '%0.2f' % (gl)),
-			('Upside Potential Ratio', '%0.2f' % (upside)), 
-			('Max Drawdown', '%0.2f%%' % (max_drawdown(pnl) * 100)),
-			('Max Drawdown Duration', '%0.2f days' % (max_drawdown_dur(pnl)/(N/250))),
-			('Avg Drawdown', '%0.2f%%' % (dd.mean() * 100)),
-			('Avg Drawdown Duration', '%0.2f days' % (drawdown_dur(pnl).mean()/(N/250))),
-			('PCM Ratio', '%0.2f' % (pcm_ratio(pnl, returns, N=N))),
-		])
-		return stats
+		dd_dur = drawdown_dur(pnl, dd=dd)
+		days = N / 250
+
+		values = (
+			total_return - 1, cagr, alpha, beta, bench_adj,
+			sharpe, sortino, gl, upside,
+			max_drawdown(pnl, dd=dd), dd_dur.max() / days,
+			dd.mean(), dd_dur.mean() / days,
+			pcm_ratio(pnl, N=N, returns=returns, dd=dd, dd_dur=dd_dur),
+		)
+		stats = OrderedDict(
+			(label, fmt % (value * scale))
+			for (label, fmt, scale), value in zip(SUMMARY_FORMATS, values)
+		)
+		self._stats_cache = (curve, N, stats)
+		return OrderedDict(stats)
 
 
 	def plot_equity_curve(self):
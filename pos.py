@@ -1,13 +1,24 @@
 import numpy as np
 
-from collections import defaultdict
-
 from .trade import Trade
 from .errors import NoOpenTrade, OverFilling
 from .conf import LONG, SHORT, EXIT, BUY, SELL, MKT
 from .event import SignalEventPct, OrderEvent
 
 
+# re-sum the trades after every update and assert the running sums match,
+# for chasing accounting drift, costs O(trades) per event
+CHECK_SUMS = False
+
+
+def _contribution(trade):
+	"""What one trade adds to the position sums, same order as `_add`"""
+	return (
+		trade.mv, trade.position * trade.quantity, abs(trade.open_quantity),
+		trade.cost, trade.max_cost, trade.profit, trade.max_profit,
+	)
+
+
 class Position:
 	"""A security position that assoicates with one Symbol
 	- position size, average cost (inc commission), market value
@@ -18,9 +29,13 @@ class Position:
 		'symbol', 'pct_portfolio', 'rebalance', 'hard_stop',
 		'tick', '_open_trade', 'trades', 'trade_mapper',
 		'signals', 'closed_trades',
+		'_mv', '_quantity', '_open_quantity', '_cost', '_max_cost',
+		'_profit', '_max_profit', '_rebalance_at', '_rebalance_trade',
+		'_needs_checks', '_t', '_drawdown',
 	]
 
 	signal_lvl = ('hard_stop', 'normal', 'rebalance')
+	signal_idx = {'hard_stop': 0, 'normal': 1, 'rebalance': 2}
 
 
 	def __init__(self, symbol, pct_portfolio, rebalance=0, hard_stop=0):
@@ -37,12 +52,25 @@ class Position:
 		self.rebalance = rebalance
 		self.hard_stop = hard_stop
 
+		# without both of them, no position level signal at all
+		self._needs_checks = bool(hard_stop) or bool(rebalance)
+
 		self.tick = None
 		self._open_trade = None  # there should be only one opening trade
 		self.trades = {}  # {trade id: trade instance}
 		self.trade_mapper = {}  # {order id: trade id}
 		# self.closed_trades = []
-		self.signals = defaultdict(lambda: None)
+		self.signals = [None, None, None]  # one slot per `signal_lvl`
+
+		# running sums over the trades, moved by each trade's change
+		self._mv = self._quantity = self._open_quantity = 0
+		self._cost = self._max_cost = 0
+		self._profit = self._max_profit = 0
+		self._derive()
+
+		# next `t` to rebalance, scheduled for the trade it belongs to
+		self._rebalance_at = 0
+		self._rebalance_trade = False  # never an id, first check schedules
 
 
 	def __repr__(self):
@@ -82,6 +110,10 @@ class Position:
 		else:
 			return False
 
+	@property
+	def has_signals(self):
+		return any(self.signals)
+
 	@property
 	def has_long(self):
 		return self.position is LONG
@@ -92,10 +124,7 @@ class Position:
 
 	@property
 	def t(self):
-		try:
-			return self.open_trade.t
-		except NoOpenTrade:
-			return 0
+		return self._t
 
 	@property
 	def r(self):
@@ -114,15 +143,12 @@ class Position:
 
 	@property
 	def drawdown(self):
-		try:
-			return self.max_profit / self.profit - 1
-		except ZeroDivisionError:
-			return 0
+		return self._drawdown
 
 	@property
 	def mv(self):
 		"""Current Market Value of the position"""
-		return sum(t.mv for t in self.trades.values())
+		return self._mv
 
 	@property
 	def total_quantity(self):
@@ -133,35 +159,85 @@ class Position:
 
 	@property
 	def open_quantity(self):
-		return sum(abs(t.open_quantity) for t in self.trades.values())
+		return self._open_quantity
 
 	@property
 	def quantity(self):
-		return sum(t.position * t.quantity for t in self.trades.values())
+		return self._quantity
 
 	@property
 	def cost(self):
-		return sum(t.cost for t in self.trades.values())
+		return self._cost
 
 	@property
 	def max_cost(self):
-		return sum(t.max_cost for t in self.trades.values())
+		return self._max_cost
 
 	@property
 	def profit(self):
-		return sum(t.profit for t in self.trades.values())
+		return self._profit
 
 	@property
 	def max_profit(self):
-		return sum(t.max_profit for t in self.trades.values())
+		return self._max_profit
+
+
+	def _add(self, before, after):
+		"""Move the running sums by the change of one trade
+
+		Parameter:
+		----------
+		before, after: `_contribution` of the trade around the update,
+			a new trade comes from all zeros, a removed one goes to them
+		"""
+		mv, quantity, open_quantity, cost, max_cost, profit, max_profit = after
+		self._mv += mv - before[0]
+		self._quantity += quantity - before[1]
+		self._open_quantity += open_quantity - before[2]
+		self._cost += cost - before[3]
+		self._max_cost += max_cost - before[4]
+		self._profit += profit - before[5]
+		self._max_profit += max_profit - before[6]
+
+
+	def _derive(self):
+		"""Values derived from the sums, after any of them moved
+		- no trades left, the sums restart from exact zeros, no float drift
+		"""
+		if not self.trades:
+			self._mv = self._quantity = self._open_quantity = 0
+			self._cost = self._max_cost = 0
+			self._profit = self._max_profit = 0
+
+		profit = self._profit
+		self._drawdown = self._max_profit / profit - 1 if profit else 0
+
+		trade = self.trades.get(self._open_trade)
+		self._t = trade.t if trade is not None else 0
+
+		assert not CHECK_SUMS or self._sums_match()
+
+
+	def _sums_match(self):
+		"""Full re-sum of the trades, against the running sums"""
+		sums = [0] * 7
+		for trade in self.trades.values():
+			for k, v in enumerate(_contribution(trade)):
+				sums[k] += v
+
+		return np.allclose(sums, [
+			self._mv, self._quantity, self._open_quantity, self._cost,
+			self._max_cost, self._profit, self._max_profit,
+		])
 
 
 	def _reset_signals(self):
-		"""A dictionary that stores all generated signal in this heartbeat
-		- that is tag for urgency
+		"""A list that stores all generated signal in this heartbeat
+		- that is indexed by urgency, same order as `signal_lvl`
 		- one strategy will can only generate one signal per symbol
 		"""
-		self.signals.clear()
+		signals = self.signals
+		signals[0] = signals[1] = signals[2] = None
 
 
 	def _update_data(self, tick):
@@ -178,8 +254,13 @@ class Position:
 		"""
 		self.tick = tick
 
+		add = self._add
 		for trade in self.trades.values():
+			before = _contribution(trade)
 			trade.on_market(tick)
+			add(before, _contribution(trade))
+
+		self._derive()
 
 
 	def _generate_signal(self, signal_type, lvl, **kws):
@@ -200,7 +281,7 @@ class Position:
 		else:
 			strength = kws.get('strength', self.pct_portfolio)
 
-		self.signals[lvl] = SignalEventPct(
+		self.signals[self.signal_idx[lvl]] = SignalEventPct(
 			self.symbol, signal_type, strength=strength
 		)
 
@@ -225,8 +306,17 @@ class Position:
 		# if the strategy have no rebalance period
 		if self.rebalance == 0: return
 
-		if self.t % self.rebalance == 0:
+		# a new open trade restarts the schedule, as `t` starts over
+		if self._open_trade != self._rebalance_trade:
+			self._rebalance_trade = self._open_trade
+			self._rebalance_at = self.rebalance
+
+		# every multiple of rebalance, or every tick without an open trade
+		t = self.t
+		if t == 0 or t >= self._rebalance_at:
 			self._generate_signal(self.position, lvl='rebalance')
+			if t:
+				self._rebalance_at = (t // self.rebalance + 1) * self.rebalance
 
 
 	def generate_orders(self, equity):
@@ -246,9 +336,9 @@ class Position:
 		trade_qty = []
 
 		# get signal based on urgency
-		for lvl in self.signal_lvl:
-			if lvl in self.signals:
-				signal = self.signals[lvl]
+		for lvl, evt in zip(self.signal_lvl, self.signals):
+			if evt is not None:
+				signal = evt
 				signal_lvl = lvl
 				break   # only generate one signal per symbol
 
@@ -260,7 +350,7 @@ class Position:
 			Q = self.total_quantity
 			if Q == 0:  # there is no trade
 				trade_qty.append(target)
-			elif np.sign(target) == np.sign(Q):  # same direction trade
+			elif (target > 0) == (Q > 0):  # same direction trade
 				trade_qty.append(target - Q)
 			else:  # revseing trade
 				trade_qty.append(-Q)
@@ -270,10 +360,7 @@ class Position:
 		for q in trade_qty:
 			if not q: continue  # if 0 quantity
 
-			if np.sign(q) == 1:
-				fill_type = BUY
-			elif np.sign(q) == -1:
-				fill_type = SELL
+			fill_type = BUY if q > 0 else SELL
 
 			# get the order
 			order = OrderEvent(self.symbol, MKT, abs(q), fill_type)
@@ -287,6 +374,7 @@ class Position:
 
 		try:  # if there is open_trade, need to check to close it or not
 			trade = self.open_trade
+			before = _contribution(trade)
 			trade.on_order(oid, order.quantity, order.direction.value)
 
 			if trade.is_closing:
@@ -300,8 +388,11 @@ class Position:
 
 			self._open_trade = trade.id
 			self.trades[trade.id] = trade
+			before = (0, ) * 7
 		
 		self.trade_mapper[oid] = trade.id
+		self._add(before, _contribution(trade))
+		self._derive()
 
 
 	def on_fill(self, fill):
@@ -310,6 +401,7 @@ class Position:
 		trade_id = self.trade_mapper[oid]
 
 		trade = self.trades[trade_id]
+		before = _contribution(trade)
 		trade.on_fill(
 			oid, fill.quantity, fill.fill_type.value,
 			fill.fill_cost, fill.commission
@@ -318,3 +410,8 @@ class Position:
 		if trade.is_closed:
 			self.trades.pop(trade.id)
 			# self.closed_trades.append(trade)
+			self._add(before, (0, ) * 7)
+		else:
+			self._add(before, _contribution(trade))
+
+		self._derive()
@@ -6,10 +6,9 @@ from tqdm import tqdm
 from functools import lru_cache
 from threading import Thread
 from math import ceil
-from copy import copy
 
 from .pos import Position
-from .base import BaseConsumer
+from .base import BaseConsumer, SELF
 from .event import SignalEventPct, OrderEvent
 from .conf import LONG, SHORT, EXIT, MKT, BUY, SELL, LOCAL_TZ
 from .util import clean_timestamp
@@ -35,6 +34,17 @@ class BaseStrategy(BaseConsumer):
 	the Strategy object is agnostic to the data source,
 	since it obtains the 'Tick' object from MarketEvent message
 	"""
+	_subs = (
+		('ack-reg-feed', SELF, 'on_ack_reg_feed'),
+		('ack-dereg_feed', SELF, 'on_ack_dereg_feed'),
+		('ack-reg-exe', SELF, 'on_ack_reg_exe'),
+		('ack-dereg-exe', SELF, 'on_ack_dereg_exe'),
+		('eod', SELF, 'on_eod'),
+		('tick', SELF, 'on_market'),
+		('fill', SELF, 'on_fill'),
+		('fills', SELF, 'on_fills'),
+	)
+
 	def __init__(
 		self, symbol_list, allocation, freq, positions,
 		start, end, warmup=0, fixed_allocation=True,
@@ -94,10 +104,17 @@ class BaseStrategy(BaseConsumer):
 			pos_dict[perm_tick] = pos
 		self.pos = pos_dict
 
+		# sums over the positions, refreshed on new tick and fills
+		self._refresh_totals()
+
 		# starting is always 0, it will increment itself every market tick
 		self.t = 0
-		self._hist = []
+
+		# history of the ticks after warmup, one row per tick,
+		# column arrays start with `batch_size` rows and grow when full
 		self.batch_size = batch_size
+		self._hist_len = 0
+		self._hist = self._new_hist(batch_size)
 
 		super().__init__(comp_type='STGY', required=['feed', 'exe'])
 
@@ -110,17 +127,6 @@ class BaseStrategy(BaseConsumer):
 			"By calling this method to calculate 'Signal' Events"
 		)
 
-	def subscriptions(self):
-		return [
-			('ack-reg-feed', self.id, self.on_ack_reg_feed),
-			('ack-dereg_feed', self.id, self.on_ack_dereg_feed),
-			('ack-reg-exe', self.id, self.on_ack_reg_exe),
-			('ack-dereg-exe', self.id, self.on_ack_dereg_exe),
-			('eod', self.id, self.on_eod),
-			('tick', self.id, self.on_market),
-			('fill', self.id, self.on_fill),
-		]
-		
 	def update_data(self, ticks):
 		pass
 
@@ -145,11 +151,11 @@ class BaseStrategy(BaseConsumer):
 	@property
 	def nav(self):
 		"""Net Account Value / Net Liquidating Value"""
-		return sum(pos.mv for pos in self.pos.values()) + self.cash
+		return self._total_mv + self.cash
 
 	@property
 	def total_cost(self):
-		return sum(pos.cost for pos in self.pos.values())
+		return self._total_cost
 
 	@property
 	def total_bp(self):
@@ -160,19 +166,22 @@ class BaseStrategy(BaseConsumer):
 
 	@property
 	def avaliable_bp(self):
+		"""Buying power left, a plain number computed on each access"""
 		return self.total_bp - self.total_cost
 
 	def start(self):
 		while self.status != 'RUNNING':	
 			time.sleep(2)
 
-		# setting up progress bar
+		# setting up progress bar, updated once per day of ticks
+		self._pbar_batch = int(np.ceil(self.freq.one_day))
+		self._pbar_pending = 0
 		self._pbar = tqdm(
 			total=int(np.ceil(
 				pd.bdate_range(self.start_dt, self.end_dt).size
 				* np.ceil(self.freq.one_day)
 			)),
-			miniters=int(np.ceil(self.freq.one_day)),
+			miniters=self._pbar_batch,
 			unit=' tick<{}>'.format(self.freq.value),
 		)
 
@@ -218,10 +227,25 @@ class BaseStrategy(BaseConsumer):
 		fill (Fill Event)
 		"""
 		logger.info('Consuming filled Order')
-		fill = body['fill']
+		self._on_fill(body['fill'])
+
 
+	def on_fills(self, oid, body):
+		"""Upon all the orders filled on one bar, published at once
+
+		Parameter:
+		----------
+		fills (list of Fill Event)
+		"""
+		logger.info('Consuming %s filled Orders', len(body['fills']))
+		for fill in body['fills']:
+			self._on_fill(fill)
+
+
+	def _on_fill(self, fill):
 		# update the position first
 		self.pos[fill.symbol].on_fill(fill)
+		self._refresh_totals()
 
 		# getting data from the fill event
 		Q = fill.quantity
@@ -258,14 +282,19 @@ class BaseStrategy(BaseConsumer):
 
 			# publish generated signals
 			equity = self.total_bp
-			bp = copy(self.avaliable_bp)  # current snap_shot of buying power
-			for S, pos in self.pos.items():
+			bp = self.avaliable_bp  # a float, already a snap_shot of buying power
+			for pos in self.pos.values():
+				if not pos.has_signals: continue  # nothing to order
+
 				for order, lvl in pos.generate_orders(equity):
 					used_bp = self.on_order(order, lvl, bp)
 					bp -= used_bp
 				
 			# save old strategy performance history
-			self._pbar.update(1)
+			self._pbar_pending += 1
+			if self._pbar_pending >= self._pbar_batch:
+				self._pbar.update(self._pbar_pending)
+				self._pbar_pending = 0
 		
 		# if ticks.timestamp >= self.start_dt:
 			# self.basic_publish('next', sender=self.id)
@@ -292,7 +321,7 @@ class BaseStrategy(BaseConsumer):
 		"""
 		S = order.symbol
 
-		need_bp = order.quantity * self.ticks[S].close
+		need_bp = order.quantity * self.ticks.data[S].close
 		if need_bp <= bp:  # have enough buying power to place order
 			used_bp = need_bp
 
@@ -330,7 +359,8 @@ class BaseStrategy(BaseConsumer):
 	def _calculate_signals(self):
 		# update existing position information
 		for pos in self.pos.values():
-			pos._calculate_signals()
+			if pos._needs_checks:
+				pos._calculate_signals()
 
 		self.calculate_signals()
 
@@ -348,21 +378,85 @@ class BaseStrategy(BaseConsumer):
 		self.ticks = ticks
 		self.t += 1
 
+		bars = ticks.data
 		for S, pos in self.pos.items():
-			pos._update_data(ticks[S])
+			pos._update_data(bars[S])
+		self._refresh_totals()
 
 		self.update_data(ticks)
 
 
-	def _save_positions(self):
-		output = {
-			'timestamp': self.ticks.timestamp, 't': self.t,
-			'cash': self.cash, 'commission': self.commission,
-			'nav': self.nav,
+	def _refresh_totals(self):
+		"""Sum up market value and cost of all the positions once
+		- `nav`, `total_cost` and buying power simply read the sums
+		"""
+		mv = cost = 0
+		for pos in self.pos.values():
+			mv += pos.mv
+			cost += pos.cost
+
+		self._total_mv = mv
+		self._total_cost = cost
+
+
+	def _new_hist(self, n):
+		"""Empty history columns for `n` ticks, quantity and mv
+		have one column per position in the order of `self.pos`
+		"""
+		num_pos = len(self.pos)
+		return {
+			'timestamp': np.empty(n, dtype=np.int64),  # ns since epoch, UTC
+			't': np.empty(n, dtype=np.int64),
+			'cash': np.empty(n, dtype=np.float64),
+			'commission': np.empty(n, dtype=np.float64),
+			'nav': np.empty(n, dtype=np.float64),
+			'quantity': np.empty((n, num_pos), dtype=np.int64),
+			'mv': np.empty((n, num_pos), dtype=np.float64),
 		}
-		for k, v in self.pos.items():
-			output[str(k)+'_quantity'] = v.quantity
-			output[str(k)+'_mv'] = v.mv
 
-		self._hist.append(output)
+
+	def _save_positions(self):
+		i = self._hist_len
+		hist = self._hist
+		if i == len(hist['t']):  # full, at least double all the columns
+			more = self._new_hist(max(self.batch_size, i, 1))
+			hist = self._hist = {
+				k: np.concatenate([v, more[k]]) for k, v in hist.items()
+			}
+
+		hist['timestamp'][i] = self.ticks.timestamp.value
+		hist['t'][i] = self.t
+		hist['cash'][i] = self.cash
+		hist['commission'][i] = self.commission
+		hist['nav'][i] = self.nav
+
+		quantity, mv = hist['quantity'][i], hist['mv'][i]
+		for k, pos in enumerate(self.pos.values()):
+			quantity[k] = pos.quantity
+			mv[k] = pos.mv
+
+		self._hist_len = i + 1
+
+
+	def history(self):
+		"""Saved history of the strategy as a DataFrame
+
+		Return:
+		-------
+		DataFrame with one row per tick after warmup, columns of
+		timestamp, t, cash, commission, nav
+		and {symbol}_quantity, {symbol}_mv for each position
+		"""
+		n = self._hist_len
+		hist = self._hist
+
+		data = {'timestamp': pd.to_datetime(hist['timestamp'][:n], utc=True)}
+		for k in ['t', 'cash', 'commission', 'nav']:
+			data[k] = hist[k][:n]
+
+		for k, S in enumerate(self.pos):
+			data[str(S)+'_quantity'] = hist['quantity'][:n, k]
+			data[str(S)+'_mv'] = hist['mv'][:n, k]
+
+		return pd.DataFrame(data)
 		
\ No newline at end of file
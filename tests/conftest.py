@@ -0,0 +1,7 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def _no_sleep(monkeypatch):
+	"""Consumers wait on `time.sleep` while setting up, never in tests"""
+	monkeypatch.setattr('pcm_backtest.base.time.sleep', lambda *a, **kw: None)
@@ -7,8 +7,8 @@ from unittest import TestCase
 from datetime import datetime
 
 from pcm_backtest.metrics import (
-	sharpe_ratio, var_cov_var, drawdown,
-	water_mark, max_drawdown_dur
+	sharpe_ratio, var_cov_var, var_cov_var_from_returns, drawdown,
+	water_mark, max_drawdown_dur, drawdown_dur
 )
 
 
@@ -48,6 +48,13 @@ class TestVaR(TestCase):
 		)
 
 
+	def test_var_from_returns(self):
+		self.assertAlmostEqual(
+			var_cov_var_from_returns(self.P, self.c, self.rets),
+			25833.226070465054
+		)
+
+
 class TestDrawdown(TestCase):
 	def setUp(self):
 		self.pnl = pd.Series([10,15,13,9,30,31,35,31,25])
@@ -90,3 +97,11 @@ class TestDrawdownDuration(TestCase):
 
 	def test_drawdown_max_dur(self):
 		self.assertEqual(max_drawdown_dur(self.pnl), 4)
+
+
+	def test_drawdown_dur(self):
+		npt.assert_array_equal(drawdown_dur(self.pnl), np.array([3, 4]))
+
+
+	def test_drawdown_dur_no_drawdown(self):
+		npt.assert_array_equal(drawdown_dur(pd.Series([1, 2, 3])), np.array([0]))
@@ -0,0 +1,41 @@
+import pytest
+
+from datetime import datetime
+
+from pcm_backtest.event import Tick
+
+
+# ticks are immutable, built once and shared by the position & trade tests
+
+@pytest.fixture(scope='module')
+def open_tick():
+	return Tick(datetime(2011,1,1), 10, 10, 10, 10, 1000)
+
+
+@pytest.fixture(scope='module')
+def sell_tick():
+	return Tick(datetime(2011,1,2), 10, 10, 10, 10, 1000)
+
+
+@pytest.fixture(scope='module')
+def ticks():
+	return (
+		Tick(datetime(2011,1,2), 11, 11, 11, 11, 1000),
+		Tick(datetime(2011,1,2), 12, 12, 12, 12, 1000),
+	)
+
+
+@pytest.fixture(autouse=True)
+def _check_sums(monkeypatch):
+	"""Positions re-sum their trades after every update in tests"""
+	monkeypatch.setattr('pcm_backtest.pos.CHECK_SUMS', True)
+
+
+def _drive(pos, alloc=10000):
+	"""All the orders generated from the position's signals at once"""
+	return list(pos.generate_orders(alloc))
+
+
+@pytest.fixture(scope='session')
+def drive():
+	return _drive
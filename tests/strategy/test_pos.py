@@ -1,23 +1,23 @@
-import numpy as np
+import numpy as np, pytest
 
-from nose.tools import raises
 from bson import ObjectId
-from datetime import datetime
 from mock import patch, PropertyMock
 
 from pcm_backtest.pos import Position
 from pcm_backtest.trade import Trade
-from pcm_backtest.event import OrderEvent, Tick, SignalEventPct, FillEventIB
+from pcm_backtest.event import OrderEvent, SignalEventPct, FillEventIB
 from pcm_backtest.errors import NoOpenTrade
 from pcm_backtest.conf import MKT, BUY, SELL, EXIT, LONG, SHORT, SMART
 
 
 
 class TestPosition:
-	def setup(self):
+	@pytest.fixture(autouse=True)
+	def _setup(self, open_tick, sell_tick, drive):
 		self.pos = Position('A', 0.5, rebalance=5, hard_stop=0.1)
-		self.open_tick = Tick(datetime(2011,1,1), 10, 10, 10, 10, 1000)
-		self.sell_tick = Tick(datetime(2011,1,2), 10, 10, 10, 10, 1000)
+		self.drive = drive
+		self.open_tick = open_tick
+		self.sell_tick = sell_tick
 
 
 	def test_init(self):
@@ -26,7 +26,7 @@ class TestPosition:
 		assert self.pos.trades == {}
 		assert self.pos.trade_mapper == {}
 		# assert self.pos.closed_trades == []
-		assert isinstance(self.pos.signals, dict)
+		assert self.pos.signals == [None, None, None]
 		assert self.pos.signal_lvl == ('hard_stop', 'normal', 'rebalance')
 
 		assert self.pos.position is EXIT
@@ -50,9 +50,9 @@ class TestPosition:
 		assert 't=0' in str(self.pos)
 
 
-	@raises(NoOpenTrade)
 	def test_no_open_trade(self):
-		self.pos.open_trade
+		with pytest.raises(NoOpenTrade):
+			self.pos.open_trade
 
 
 	def test_update_data(self):
@@ -66,9 +66,10 @@ class TestPosition:
 		self.pos._update_data(self.open_tick)
 		self.pos._generate_signal(SHORT, 'normal')
 
-		for order, lvl in self.pos.generate_orders(10000):
-			oid = order.id
+		orders = self.drive(self.pos)
+		for order, _ in orders:
 			self.pos.confirm_order(order)
+		oid = orders[-1][0].id
 
 		self.pos.on_fill(FillEventIB(oid, 'A', SMART, 300, SELL, 10.01))
 		self.pos._update_data(self.sell_tick)
@@ -78,7 +79,7 @@ class TestPosition:
 
 	def test_generate_signal(self):
 		self.pos._generate_signal(LONG, 'normal')
-		signal = self.pos.signals['normal']
+		signal = self.pos.signals[self.pos.signal_idx['normal']]
 
 		assert isinstance(signal, SignalEventPct)
 		assert signal.symbol == self.pos.symbol
@@ -99,7 +100,7 @@ class TestPosition:
 			assert isinstance(order, OrderEvent)
 			assert lvl == 'normal'
 
-		assert self.pos.signals['normal'] is None
+		assert self.pos.signals == [None, None, None]
 
 		self.pos._generate_signal(LONG, 'normal', strength=0)
 		for order, lvl in self.pos.generate_orders(10000):
@@ -110,7 +111,7 @@ class TestPosition:
 	@patch('pcm_backtest.pos.Position.check_rebalance')
 	@patch('pcm_backtest.pos.Position.check_hard_stop')
 	@patch('pcm_backtest.pos.Position.has_position', new_callable=PropertyMock)
-	def test_calculate_signal(self, mock_has_position, mock_hs, mock_reb):
+	def test_calculate_signal_dispatch(self, mock_has_position, mock_hs, mock_reb):
 		mock_has_position.return_value = False
 		self.pos._calculate_signals()
 		mock_hs.assert_not_called()
@@ -122,39 +123,26 @@ class TestPosition:
 		mock_reb.assert_called_once()
 
 
+	@pytest.mark.parametrize('hard_stop,drawdown,should_fire', [
+		(0, 0.11, False), (0.1, 0.09, False), (0.1, 0.11, True),
+	])
 	@patch('pcm_backtest.pos.Position._generate_signal')
-	@patch('pcm_backtest.pos.Position.drawdown', new_callable=PropertyMock)
-	def test_calculate_signal(self, mock_drawdown, mock_gen_signal):
-		self.pos.hard_stop = 0
-		self.pos.check_hard_stop()
-		mock_gen_signal.assert_not_called()
-
-		self.pos.hard_stop = 0.1
-		mock_drawdown.return_value = 0.09
-		self.pos.check_hard_stop()
-		mock_gen_signal.assert_not_called()
-
-		mock_drawdown.return_value = 0.11
+	def test_check_hard_stop(self, mock_gen_signal, hard_stop, drawdown, should_fire):
+		self.pos.hard_stop = hard_stop
+		self.pos._drawdown = drawdown
 		self.pos.check_hard_stop()
-		mock_gen_signal.assert_called_once()
+		assert mock_gen_signal.called == should_fire
 
 
+	@pytest.mark.parametrize('rebalance,t,should_fire', [
+		(0, 5, False), (5, 1, False), (5, 5, True),
+	])
 	@patch('pcm_backtest.pos.Position._generate_signal')
-	@patch('pcm_backtest.pos.Position.t', new_callable=PropertyMock)
-	def test_calculate_signal(self, mock_t, mock_gen_signal):
-		self.pos.rebalance = 0
-		self.pos.check_rebalance()
-		mock_gen_signal.assert_not_called()
-
-		self.pos.rebalance = 5
-		mock_t.return_value = 1
+	def test_check_rebalance(self, mock_gen_signal, rebalance, t, should_fire):
+		self.pos.rebalance = rebalance
+		self.pos._t = t
 		self.pos.check_rebalance()
-		mock_gen_signal.assert_not_called()
-
-		self.pos.rebalance = 5
-		mock_t.return_value = 5
-		self.pos.check_rebalance()
-		mock_gen_signal.assert_called_once()
+		assert mock_gen_signal.called == should_fire
 
 
 	def test_position_has_pos_long(self):
@@ -163,9 +151,10 @@ class TestPosition:
 
 		self.pos._generate_signal(LONG, 'normal')
 
-		for order, lvl in self.pos.generate_orders(10000):
-			oid = order.id
+		orders = self.drive(self.pos)
+		for order, _ in orders:
 			self.pos.confirm_order(order)
+		oid = orders[-1][0].id
 
 		self.pos.on_fill(FillEventIB(oid, 'A', SMART, 300, BUY, 10.01))
 
@@ -173,13 +162,14 @@ class TestPosition:
 		assert self.pos.has_open_orders
 
 
-	def test_position_has_pos_long(self):
+	def test_position_has_pos_short(self):
 		self.pos._update_data(self.open_tick)
 		self.pos._generate_signal(SHORT, 'normal')
 
-		for order, lvl in self.pos.generate_orders(10000):
-			oid = order.id
+		orders = self.drive(self.pos)
+		for order, _ in orders:
 			self.pos.confirm_order(order)
+		oid = orders[-1][0].id
 
 		self.pos.on_fill(FillEventIB(oid, 'A', SMART, 300, SELL, 10.01))
 
@@ -189,7 +179,7 @@ class TestPosition:
 	def test_confirm_order(self):
 		self.pos._update_data(self.open_tick)
 		self.pos._generate_signal(LONG, 'normal')
-		for order, lvl in self.pos.generate_orders(10000):
+		for order, _ in self.drive(self.pos):
 			self.pos.confirm_order(order)
 
 		assert len(self.pos.trades) == 1
@@ -200,7 +190,7 @@ class TestPosition:
 			assert v in self.pos.trades
 
 		self.pos._generate_signal(SHORT, 'normal')
-		orders = list(self.pos.generate_orders(10000))
+		orders = self.drive(self.pos)
 		self.pos.confirm_order(orders[0][0])
 
 		assert len(self.pos.trades) == 1
@@ -215,8 +205,7 @@ class TestPosition:
 		assert self.pos.open_trade.total_quantity == 500
 
 		self.pos._generate_signal(EXIT, 'normal')
-		for order, lvl in self.pos.generate_orders(10000):
-			print(order)
+		for order, _ in self.drive(self.pos):
 			self.pos.confirm_order(order)
 
 		assert len(self.pos.trades) == 2
@@ -228,9 +217,10 @@ class TestPosition:
 		self.pos._generate_signal(LONG, 'normal')
 		assert not self.pos.has_position
 
-		for order, lvl in self.pos.generate_orders(10000):
-			oid = order.id
+		orders = self.drive(self.pos)
+		for order, _ in orders:
 			self.pos.confirm_order(order)
+		oid = orders[-1][0].id
 
 		assert self.pos.has_position
 
@@ -244,7 +234,7 @@ class TestPosition:
 		assert self.pos.open_trade.total_quantity == 500
 
 		self.pos._generate_signal(SHORT, 'normal')
-		orders = list(self.pos.generate_orders(10000))
+		orders = self.drive(self.pos)
 
 		oid = orders[0][0].id
 		self.pos.confirm_order(orders[0][0])
@@ -0,0 +1,63 @@
+import gc
+
+from blinker import ANY
+
+from pcm_backtest.base import BaseConsumer, SELF
+
+
+
+class Consumer(BaseConsumer):
+	_subs = (
+		('ping', ANY, 'on_ping'),
+		('pong', SELF, 'on_pong'),
+	)
+
+	def __init__(self):
+		self.got = []
+		super().__init__('exe')
+
+	def on_ping(self, sender, body):
+		self.got.append('ping')
+
+	def on_pong(self, sender, body):
+		self.got.append('pong')
+
+
+
+class TestBaseConsumer:
+	def test_publish(self):
+		con = Consumer()
+		con.basic_publish('ping')
+		con.basic_publish('pong', sender=con.id)
+		assert con.got == ['ping', 'pong']
+		con._stop()
+
+
+	def test_stopped_gets_nothing(self):
+		con = Consumer()
+		other = Consumer()
+		con._stop()
+
+		other.basic_publish('ping')
+		other.basic_publish('pong', sender=con.id)
+		assert con.got == []
+		assert other.got == ['ping']
+		other._stop()
+
+
+	def test_dropped_gets_nothing(self):
+		con = Consumer()
+		got = con.got
+		cid = con.id
+		del con
+		gc.collect()
+
+		other = Consumer()
+		rets = other.basic_publish('ping')
+		other.basic_publish('pong', sender=cid)
+
+		assert got == []
+		assert len(rets) == 1
+		assert ('pong', cid) not in BaseConsumer._routes
+		assert len(BaseConsumer._routes_any['ping']) == 1
+		other._stop()
@@ -1,13 +1,14 @@
-import pandas as pd, numpy as np
+import pandas as pd, numpy as np, orjson, pytest
 
 from mock import patch, PropertyMock
-from nose.tools import raises
 from datetime import datetime
 from pandas import Timestamp
 from bson import ObjectId
 
+from pcm_backtest.util import event_from_dict
+from pcm_backtest.event.core import next_id, to_objectid, from_objectid
 from pcm_backtest.event import (
-	Event, MarketEvent, Tick, SignalEventPct, OrderEvent,
+	Event, MarketEvent, MarketEventBatch, Tick, SignalEventFixed, SignalEventPct, OrderEvent,
 	FillEvent, FillEventIB
 )
 from pcm_backtest.conf import (
@@ -17,10 +18,37 @@ from pcm_backtest.conf import (
 )
 
 
+class TestEventId:
+	def test_int_round_trip(self):
+		id = next_id()
+		assert from_objectid(to_objectid(id)) == id
+		assert from_objectid(str(to_objectid(id))) == id
+
+
+	def test_objectid_round_trip(self):
+		oid = ObjectId()
+		assert to_objectid(from_objectid(oid)) == oid
+		assert to_objectid(from_objectid(str(oid))) == oid
+
+
+	def test_objectid_no_collision(self):
+		# same second and counter, different random bytes
+		a = ObjectId(bytes.fromhex('5f0000000102030405000001'))
+		b = ObjectId(bytes.fromhex('5f0000000a0b0c0d0e000001'))
+		assert from_objectid(a) != from_objectid(b)
+
+
+	def test_fill_keeps_foreign_order_id(self):
+		oid = ObjectId()
+		evt = FillEventIB(oid, 'AAPL', SMART, 100, BUY, 10.0)
+		new_evt = FillEventIB.from_dict(**evt.as_dict()['data'])
+		assert new_evt.order_id == oid
+
+
+
 class TestEvent:
-	@classmethod
 	@patch.multiple(Event, __abstractmethods__=set())
-	def setup_class(self):
+	def setup_method(self, method):
 		self.evt = Event()
 
 
@@ -28,27 +56,28 @@ class TestEvent:
 		assert len(self.evt.__slots__) == 1
 
 
-	@raises(NotImplementedError)
 	def test_as_dict_abstract(self):
-		self.evt.as_dict()
+		with pytest.raises(NotImplementedError):
+			self.evt.as_dict()
 
 
-	@raises(NotImplementedError)
 	def test_from_dict_abstract(self):
-		self.evt.from_dict()
+		with pytest.raises(NotImplementedError):
+			self.evt.from_dict()
 
 
 	@patch('pcm_backtest.event.core.Event.as_dict')
-	@patch('pcm_backtest.event.core.json.dumps')
+	@patch('pcm_backtest.event.core.orjson.dumps')
 	def test_as_json(self, mock_dump, mock_as_dict):
 		mock_as_dict.return_value = {}
 
 		self.evt.as_json()
-		mock_dump.assert_called_once_with({})
+		mock_dump.assert_called_once()
+		assert mock_dump.call_args[0] == ({}, )
 
 
 	@patch('pcm_backtest.event.core.Event.from_dict')
-	@patch('pcm_backtest.event.core.json.loads')
+	@patch('pcm_backtest.event.core.orjson.loads')
 	def test_from_json(self, mock_loads, mock_from_dict):
 		self.evt.from_json("{'a': 100}")
 		mock_loads.assert_called_once()
@@ -65,7 +94,7 @@ class TestMarketEvent:
 
 
 	def test_slot_size(self):
-		assert len(self.evt.__slots__) == 2
+		assert len(self.evt.__slots__) == 4
 
 
 	def test_type(self):
@@ -73,11 +102,10 @@ class TestMarketEvent:
 		assert self.evt.type is MARKET
 
 
-	@patch('pandas.Timestamp.isoformat')
-	def test_as_dict(self, mock_isoformat):
+	def test_as_dict(self):
 		data = self.evt.as_dict()
 
-		mock_isoformat.assert_called_once()
+		assert data['data']['a'][0] == self.evt['a'].timestamp.value
 		assert 'data' in data
 		assert data['event_type'] == 'market'
 
@@ -89,13 +117,38 @@ class TestMarketEvent:
 		assert new_evt == self.evt
 
 
+	def test_batched_round_trip(self):
+		evt2 = MarketEvent({
+			'a': Tick(Timestamp('2017-06-06T23:50:41'), 11,12,13,10,500),
+			'b': Tick(Timestamp('2017-06-06T23:50:41'), 20,21,22,19,700),
+		})
+		payload = orjson.loads(orjson.dumps(
+			MarketEvent.as_dict_batched([self.evt, evt2]),
+			option=orjson.OPT_SERIALIZE_NUMPY
+		))
+		assert payload['event_type'] == 'market_batch'
+
+		evts = MarketEvent.from_dict_batched(payload['data'])
+		assert evts == [self.evt, evt2]
+
+		assert event_from_dict(payload) == [self.evt, evt2]
+		assert MarketEventBatch.from_json(orjson.dumps(
+			MarketEvent.as_dict_batched([self.evt, evt2]),
+			option=orjson.OPT_SERIALIZE_NUMPY
+		)) == [self.evt, evt2]
+
+
 	def test_local_ts(self):
 		assert str(self.evt.local_ts.tz) == str(LOCAL_TZ)
 
 
 	@patch('pandas.Timestamp.time')
 	def test_time(self, mock_time):
-		self.evt.time
+		evt = MarketEvent({'a':
+			Tick(Timestamp('2017-06-05T23:50:41'), 10,10,10,10,1000)
+		})
+		evt.time
+		evt.time
 		mock_time.assert_called_once()
 
 
@@ -119,11 +172,12 @@ class TestSignalEvent:
 
 
 	def test_slot_size(self):
-		assert len(self.evt.__slots__) == 4
+		assert len(SignalEventFixed.__slots__) == 4
+		assert not hasattr(self.evt, '__dict__')
 
 
 	def test_init(self):
-		assert isinstance(self.evt.id, ObjectId)
+		assert isinstance(self.evt.id, int)
 		assert isinstance(self.evt.timestamp, Timestamp)
 		assert self.evt.symbol == 'AAPL'
 
@@ -160,7 +214,7 @@ class TestOrderEvent:
 
 
 	def test_init(self):
-		assert isinstance(self.evt.id, ObjectId)
+		assert isinstance(self.evt.id, int)
 		assert isinstance(self.evt.timestamp, Timestamp)
 		assert self.evt.quantity == 100
 		assert self.evt.symbol == 'AAPL'
@@ -186,9 +240,8 @@ class TestOrderEvent:
 
 
 class TestFillEvent:
-	@classmethod
 	@patch.multiple(FillEvent, __abstractmethods__=set())
-	def setup_class(self):
+	def setup_method(self, method):
 		self.evt = FillEvent(
 			order_id=ObjectId(b'123-123-1234'),
 			symbol='AAPL', exchange=SMART, quantity=100,
@@ -210,7 +263,7 @@ class TestFillEvent:
 			fill_type=BUY, fill_cost=10,
 		)
 
-		assert isinstance(evt.id, ObjectId)
+		assert isinstance(evt.id, int)
 		assert isinstance(evt.timestamp, Timestamp)
 		assert evt.quantity == 100
 		assert evt.symbol == 'AAPL'
@@ -0,0 +1,117 @@
+import numpy as np, pandas as pd, pytest
+
+from binascii import b2a_uu
+from bson import ObjectId
+
+from pcm_backtest.util import (
+	clean_timestamp, clean_timestamps, dollar_trunc,
+	compress_data, decompress_data, oid_to_ascii, ascii_to_oid,
+	to_pandas_offset,
+)
+from pcm_backtest.conf import LOCAL_TZ
+
+
+# 01:30 happens twice in New York on 2021-11-07, this is the second one
+AMBIGUOUS = pd.Timestamp('2021-11-07 06:30:00.5', tz='UTC')
+AMBIGUOUS_LOCAL = pd.Timestamp('2021-11-07 06:30:00', tz='UTC').tz_convert(LOCAL_TZ)
+
+
+
+class TestCleanTimestamp:
+	@pytest.mark.parametrize('ts,expected', [
+		('2017-06-05 10:00:01.5', '2017-06-05 06:00:01-04:00'),
+		('2017-06-05T10:00:01+00:00', '2017-06-05 06:00:01-04:00'),
+		(pd.Timestamp('2017-06-05 06:00:01.999', tz=LOCAL_TZ), '2017-06-05 06:00:01-04:00'),
+	])
+	def test_clean_timestamp(self, ts, expected):
+		assert clean_timestamp(ts) == pd.Timestamp(expected)
+		assert str(clean_timestamp(ts).tz) == str(LOCAL_TZ)
+
+
+	def test_clean_timestamp_ambiguous(self):
+		assert clean_timestamp(AMBIGUOUS) == AMBIGUOUS_LOCAL
+		assert clean_timestamp(AMBIGUOUS.tz_convert(LOCAL_TZ)) == AMBIGUOUS_LOCAL
+
+
+	def test_clean_timestamps(self):
+		idx = clean_timestamps(['2017-06-05 10:00:01.5', '2017-06-06'])
+		assert list(idx) == [
+			pd.Timestamp('2017-06-05 06:00:01-04:00'),
+			pd.Timestamp('2017-06-05 20:00:00-04:00'),
+		]
+		assert str(idx.tz) == str(LOCAL_TZ)
+
+
+	def test_clean_timestamps_ambiguous(self):
+		idx = pd.DatetimeIndex([AMBIGUOUS]).tz_convert(LOCAL_TZ)
+		assert list(clean_timestamps(idx)) == [AMBIGUOUS_LOCAL]
+		assert list(clean_timestamps(pd.DatetimeIndex([AMBIGUOUS]))) == [AMBIGUOUS_LOCAL]
+
+
+
+class TestDollarTrunc:
+	@pytest.mark.parametrize('x,expected', [
+		(0, '-'),
+		(99, '$99'), (-99, '$-99'),
+		(100, '$100'), (-100, '$-100'),
+		(999, '$999'), (-999, '$-999'),
+		(1000, '$1K'), (-1000, '$-1K'),
+		(1e6, '$1M'), (-1e6, '$-1M'),
+		(1e9, '$1B'), (-1e9, '$-1B'),
+	])
+	def test_dollar_sign(self, x, expected):
+		assert dollar_trunc(x, dollar_sign=True) == expected
+
+
+	@pytest.mark.parametrize('x,decimal,expected', [
+		(150.25, 1, '150.2'), (1500, 1, '1.5K'), (2.5e6, 2, '2.50M'),
+	])
+	def test_decimal(self, x, decimal, expected):
+		assert dollar_trunc(x, decimal=decimal) == expected
+
+
+
+class TestCodec:
+	def test_round_trip(self):
+		data = {
+			'event_type': 'order',
+			'data': {'symbol': 'A', 'quantity': 10, 'price': 10.5, 'ok': True},
+		}
+		payload = compress_data(data)
+		assert payload[:1] == b'J'
+		assert payload[1:5] == b'\x28\xb5\x2f\xfd'  # zstd frame
+		assert decompress_data(payload) == data
+
+
+	def test_numpy(self):
+		payload = compress_data({'a': np.arange(3), 'b': np.float64(1.5)})
+		assert decompress_data(payload) == {'a': [0, 1, 2], 'b': 1.5}
+
+
+	def test_unknown_tag(self):
+		with pytest.raises(ValueError):
+			decompress_data(b'P' + compress_data({})[1:])
+
+
+
+class TestObjectIdCodec:
+	def test_round_trip(self):
+		oid = ObjectId()
+		string = oid_to_ascii(oid)
+		assert string == str(oid)
+		assert len(string) == 24
+		assert ascii_to_oid(string) == oid
+
+
+	def test_legacy_uuencoded(self):
+		oid = ObjectId()
+		assert ascii_to_oid(b2a_uu(oid.binary).decode('ascii')) == oid
+
+
+
+@pytest.mark.parametrize('bar_size,expected', [
+	('1 min', '1T'), ('5 mins', '5T'), ('30 secs', '30S'),
+	('1 hour', '1H'), ('1 day', '1D'), ('1day', '1D'), ('15mins', '15T'),
+])
+def test_to_pandas_offset(bar_size, expected):
+	assert to_pandas_offset(bar_size) == expected
@@ -1,17 +1,73 @@
 import numpy as np
 
 from bson import ObjectId
-from copy import copy
-from collections import deque
 from .errors import OverFilling
 
 
+LOTS = 256  # initial capacity of the share queue
+
+
+class OpenOrder:
+	"""Unfilled part of an order on a trade"""
+	__slots__ = ['Q', 'D']
+
+	def __init__(self, Q, D):
+		self.Q = Q  # quantity left to fill
+		self.D = D  # direction, 1 for BUY, -1 for SELL
+
+
+def fifo_close(sq_q, sq_c, head, tail, quantity):
+	"""Close `quantity` shares from the front of a FIFO share queue
+	- the last lot consumed may be partial, it is shrunk in place
+
+	Parameter:
+	----------
+	sq_q, sq_c: arrays of lot quantity and cost per share
+	head, tail: bounds of the open lots in the arrays
+	quantity: int, shares to close
+
+	Return:
+	-------
+	new head, total cost of the closed shares
+	"""
+	if head == tail:
+		raise OverFilling('No more shares to be closed')
+
+	head_q = int(sq_q[head])
+	if quantity <= head_q:  # within the oldest lot, no temporaries
+		n = 1
+		left = head_q - quantity
+		closed_cost = quantity * float(sq_c[head])
+
+	else:  # lots consumed by the fill, the last one may be partial
+		lots_q = sq_q[head:tail]
+		filled = np.cumsum(lots_q)
+		if filled[-1] < quantity:
+			raise OverFilling('No more shares to be closed')
+		n = int(np.searchsorted(filled, quantity)) + 1
+		left = int(filled[n-1]) - quantity
+
+		taken = lots_q[:n].copy()
+		taken[-1] -= left
+		closed_cost = float(np.dot(taken, sq_c[head:head+n]))
+
+	if left:
+		head += n - 1
+		sq_q[head] = left
+	else:
+		head += n
+
+	return head, closed_cost
+
+
 
 class Trade:
 	__slots__ = [
 		't', 'position', 'open_quantity', 'quantity',
 		'realized', 'cost', 'max_cost', 'max_profit',
-		'orders', 'share_queue', 'tick', 'id',
+		'orders', 'tick', 'id',
+		'_cost_basis', '_unrealized', '_mv',
+		'_sq_q', '_sq_c', '_sq_head', '_sq_tail',
 	]
 
 	"""A Trade Position when created up on opening order"""
@@ -26,10 +82,21 @@ class Trade:
 		self.max_cost = 0
 		self.max_profit = 0
 
+		# marked on fill and on tick, nothing is held at creation
+		self._cost_basis = 0
+		self._unrealized = 0
+		self._mv = 0
+
 		self.orders = {}
-		self.share_queue = deque()
 		self.tick = tick
 
+		# FIFO share queue as parallel arrays of lot quantity and cost/share,
+		# the open lots are [_sq_head, _sq_tail)
+		self._sq_q = np.empty(LOTS, dtype=np.int64)
+		self._sq_c = np.empty(LOTS, dtype=np.float64)
+		self._sq_head = 0
+		self._sq_tail = 0
+
 		self.on_order(oid, quantity, direction)
 		self.id = ObjectId()
 
@@ -41,23 +108,23 @@ class Trade:
 		)
 
 
+	@property
+	def share_queue(self):
+		"""Quantities of the open lots, oldest first"""
+		return self._sq_q[self._sq_head:self._sq_tail]
+
 	@property
 	def has_open_orders(self):
 		return len(self.orders) != 0
 
 	@property
 	def cost_basis(self):
-		try:
-			return self.cost / self.quantity
-		except ZeroDivisionError:
-			return 0
+		return self._cost_basis
 
 	@property
 	def r(self):
-		try:
-			return self.profit / self.max_cost
-		except ZeroDivisionError:
-			return -np.inf
+		max_cost = self.max_cost
+		return self.profit / max_cost if max_cost else -np.inf
 
 	@property
 	def profit(self):
@@ -65,10 +132,8 @@ class Trade:
 
 	@property
 	def drawdown(self):
-		try:
-			return self.max_profit / self.profit - 1
-		except ZeroDivisionError:
-			return 0
+		profit = self.profit
+		return self.max_profit / profit - 1 if profit else 0
 
 	@property
 	def total_quantity(self):
@@ -93,14 +158,11 @@ class Trade:
 
 	@property
 	def mv(self):
-		return self.position * self.tick.close * self.quantity
+		return self._mv
 
 	@property
 	def unrealized(self):
-		return (
-			self.position * self.quantity
-			* (self.tick.close - self.cost_basis)
-		)
+		return self._unrealized
 
 
 	def as_dict(self):
@@ -115,73 +177,80 @@ class Trade:
 		}
 
 
+	def _mark(self):
+		"""Mark the holding to the current tick, after a fill or a new tick"""
+		close = self.tick.close
+		quantity = self.quantity
+
+		self._mv = self.position * close * quantity
+		self._unrealized = self.position * quantity * (close - self._cost_basis)
+
+
 	def on_market(self, tick):
 		self.tick = tick
-		price = tick.close
+		self._mark()
 
 		self.t += 1
-		self.max_profit = max(self.profit, self.max_profit)
+		profit = self._unrealized + self.realized
+		if profit > self.max_profit:
+			self.max_profit = profit
 
 
 	def on_order(self, oid, quantity, direction):
 		self.open_quantity += self.position * direction * quantity
-		self.orders[oid] = {'Q': quantity, 'D': direction}
+		self.orders[oid] = OpenOrder(quantity, direction)
+
+
+	def _push_lot(self, quantity, cps):
+		"""Append a lot to the share queue, growing it when full"""
+		tail = self._sq_tail
+		if tail == len(self._sq_q):
+			head = self._sq_head
+			n = tail - head
+			size = max(LOTS, 2 * n)
+			for name in ('_sq_q', '_sq_c'):
+				old = getattr(self, name)
+				new = np.empty(size, dtype=old.dtype)
+				new[:n] = old[head:tail]
+				setattr(self, name, new)
+			self._sq_head, tail = 0, n
+
+		self._sq_q[tail] = quantity
+		self._sq_c[tail] = cps
+		self._sq_tail = tail + 1
 
 
 	def on_fill(self, oid, quantity, direction, cost, commission):
-		need_fill = quantity
+		order = self.orders.get(oid)
+		if order is None or order.Q < quantity:
+			raise OverFilling('No matching order')
 
 		if direction == self.position:  # opening more
 			cps = cost + self.position * commission/quantity
-			shares = {'Q': quantity, 'C': cps}
-
-			while need_fill > 0:
-				try:
-					order = copy(self.orders[oid])
-				except KeyError:
-					raise OverFilling('No matching order')
-
-				Q = min(order['Q'], need_fill)
-				order['Q'] -= Q
-				need_fill -= Q
-				self.open_quantity -= Q
-				self.quantity += Q
-
-				if order['Q'] != 0:
-					self.orders[oid] = order
-				else:
-					self.orders.pop(oid)
-
-			self.cost += shares['C'] * Q
+
+			self.cost += cps * quantity
 			self.max_cost = max(self.cost, self.max_cost)
-			self.share_queue.append(shares)
+			self._push_lot(quantity, cps)
+
+			self.open_quantity -= quantity
+			self.quantity += quantity
 
 		else:  # closing
 			cps = cost - self.position * commission/quantity
-			
-			while need_fill > 0:
-				try:
-					order = copy(self.orders[oid])
-					shares = self.share_queue.popleft()
-				except KeyError:
-					raise OverFilling('No maching order')
-				except IndexError:
-					raise OverFilling('No more shares to be closed')
-
-				Q = min(shares['Q'], need_fill)
-				shares['Q'] -= Q
-				order['Q'] -= Q
-				need_fill -= Q
-
-				self.cost -= Q * shares['C']
-				self.realized += self.position * Q * (cps - shares['C'])
-				self.open_quantity += Q
-				self.quantity -= Q
-
-				if shares['Q'] != 0:
-					self.share_queue.appendleft(shares)
-
-				if order['Q'] != 0:
-					self.orders[oid] = order
-				else:
-					self.orders.pop(oid)
+
+			self._sq_head, closed_cost = fifo_close(
+				self._sq_q, self._sq_c, self._sq_head, self._sq_tail, quantity
+			)
+
+			self.cost -= closed_cost
+			self.realized += self.position * (quantity * cps - closed_cost)
+			self.open_quantity += quantity
+			self.quantity -= quantity
+
+		order.Q -= quantity
+		if order.Q == 0:
+			self.orders.pop(oid)
+
+		# cost basis only moves on fills
+		self._cost_basis = self.cost / self.quantity if self.quantity else 0
+		self._mark()
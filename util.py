@@ -1,15 +1,19 @@
-import inspect, lz4, pickle, pandas as pd
+import inspect, orjson, re, pandas as pd, zstandard as zstd
 
-from binascii import a2b_uu, b2a_uu
+from binascii import a2b_uu
 from bson import ObjectId
 from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from ibapi.contract import Contract as IBcontract
 
 from .event import EVENT_MAP
 from .conf import LOCAL_TZ, GLOBAL_TZ
 
 
-thread_pool = ThreadPoolExecutor(50)
+@lru_cache(maxsize=None)
+def thread_pool():
+	"""Process wide thread pool, created on first use"""
+	return ThreadPoolExecutor()
 
 
 def clean_timestamp(timestamp):
@@ -20,21 +24,66 @@ def clean_timestamp(timestamp):
 	----------
 	ts: Timestamp, can be in format `ISO` `datetime` `pd.Timestamp`
 	"""
-	ts = pd.Timestamp(timestamp).replace(microsecond=0)
-	try:
-		ts = ts.tz_convert(LOCAL_TZ)
-	except TypeError:  # not tz-aware
-		ts = ts.tz_localize(GLOBAL_TZ).tz_convert(LOCAL_TZ)
+	# floor in UTC, flooring a local time is ambiguous around DST
+	ts = pd.Timestamp(timestamp)
+	if ts.tzinfo is None:
+		ts = ts.floor('s').tz_localize(GLOBAL_TZ)
+	else:
+		ts = ts.tz_convert(GLOBAL_TZ).floor('s')
+
+	return ts.tz_convert(LOCAL_TZ)
+
+
+def clean_timestamps(timestamps):
+	"""Batched `clean_timestamp` over a whole column of timestamps
+
+	Parameter:
+	----------
+	timestamps: array-like, anything `pd.DatetimeIndex` accepts
+
+	Return:
+	-------
+	DatetimeIndex in `LOCAL_TZ`, on second resolution
+	"""
+	idx = pd.DatetimeIndex(timestamps)
+	if idx.tz is None:
+		idx = idx.floor('s').tz_localize(GLOBAL_TZ)
+	else:
+		idx = idx.tz_convert(GLOBAL_TZ).floor('s')
+
+	return idx.tz_convert(LOCAL_TZ)
 
-	return ts
+
+# wire format of `compress_data`: a one byte tag followed by the payload,
+# b'J' for orjson encoded and zstd compressed
+_JSON_TAG = b'J'
+_ZC = zstd.ZstdCompressor(level=3)
+_ZD = zstd.ZstdDecompressor()
 
 
 def decompress_data(data):
-	return pickle.loads(lz4.loads(data))
+	if data[:1] != _JSON_TAG:
+		raise ValueError('Unknown payload tag {!r}'.format(data[:1]))
+	return orjson.loads(_ZD.decompress(data[1:]))
 
 
 def compress_data(data):
-	return lz4.compressHC(pickle.dumps(data))
+	return _JSON_TAG + _ZC.compress(orjson.dumps(
+		data, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NAIVE_UTC
+	))
+
+
+_event_class = EVENT_MAP.__getitem__
+
+
+def event_from_dict(body):
+	"""Rebuild an event from its `as_dict()` form
+
+	Parameter:
+	----------
+	body: dict, with `event_type` and `data` keys, e.g. `decompress_data` output
+	"""
+	return _event_class(body['event_type']).from_dict_raw(body['data'])
 
 
 def key_groups(routing_key):
@@ -48,13 +97,17 @@ def key_groups(routing_key):
 
 
 def oid_to_ascii(oid):
-	return b2a_uu(oid.binary).decode('ascii')
+	return oid.binary.hex()
 
 def ascii_to_oid(string):
+	if len(string) == 24:
+		return ObjectId(bytes.fromhex(string))
+	# legacy uuencoded form, length char + 16 chars + newline
 	return ObjectId(a2b_uu(string))
 	
+@lru_cache(maxsize=1024)
 def funcspec(func):
-	return inspect.getargsepc(func)
+	return inspect.getfullargspec(func)
 
 
 def as_tuple(items):
@@ -66,10 +119,21 @@ def as_tuple(items):
 	------
 	a tuple of stuffs
 	"""
-	if items is not None and not isinstance(items, (list, tuple)):
-		return (items, )
-	else:
+	cls = type(items)
+	if cls is tuple or cls is list or items is None:
+		return items
+	elif isinstance(items, (list, tuple)):  # subclasses, e.g. namedtuple
 		return items
+	else:
+		return (items, )
+
+
+@lru_cache(maxsize=16)
+def _dollar_specs(decimal):
+	"""Format specs for plain, thousand, million & billion values"""
+	return tuple(
+		'{:,.%sf}%s' % (decimal, unit) for unit in ('', 'K', 'M', 'B')
+	)
 
 
 def dollar_trunc(x, decimal=0, dollar_sign=False):
@@ -85,27 +149,22 @@ def dollar_trunc(x, decimal=0, dollar_sign=False):
 	----
 	if x is 0 the output will always be '-' w/o the dollar sign
 	"""
+	if x == 0:
+		return '-'
+
 	abs_x = abs(x)
-	
-	if abs_x!=0:
-		if abs_x < 1e2:   # below one hundred
-			output = ('{:,.%sf}' % decimal).format(x)
-		if abs_x < 1e6:   # below one million
-			output = ('{:,.%sf}K' % decimal).format(x/1e3)
-		elif abs_x < 1e9: # below one billion
-			output = ('{:,.%sf}M' % decimal).format(x/1e6)
-		else:
-			output = ('{:,.%sf}B' % decimal).format(x/1e9)
+	specs = _dollar_specs(decimal)
+
+	if abs_x < 1e3:   # below one thousand
+		output = specs[0].format(x)
+	elif abs_x < 1e6:   # below one million
+		output = specs[1].format(x/1e3)
+	elif abs_x < 1e9: # below one billion
+		output = specs[2].format(x/1e6)
 	else:
-		output = '-'
+		output = specs[3].format(x/1e9)
 
-	if dollar_sign:
-		if output != '-':
-			return '$' + output
-		else:
-			return output
-	else:
-		return output
+	return '$' + output if dollar_sign else output
 
 
 def gen_int_id(threshold):
@@ -116,45 +175,47 @@ def gen_int_id(threshold):
 		i += 1
 
 
-def forex_contract(symbol):
+def _contract(**fields):
+	"""IB contract with all the given fields set in one go"""
 	C = IBcontract()
-	C.symbol = symbol.split('.')[0]
-	C.secType = 'CASH'
-	C.exchange = 'IDEALPRO'
-	C.currency = symbol.split('.')[-1]
+	vars(C).update(fields)
 	return C
 
 
+def forex_contract(symbol):
+	base, _, currency = symbol.partition('.')
+	return _contract(
+		symbol=base, secType='CASH', exchange='IDEALPRO',
+		currency=currency.rpartition('.')[-1] or base,
+	)
+
+
 def index_contract(symbol, exg='CBOE', currency='USD'):
-	C = IBcontract()
-	C.symbol = symbol
-	C.secType = 'IND'
-	C.currency = currency
-	C.exchange = exg
-	return C
+	return _contract(
+		symbol=symbol, secType='IND', currency=currency, exchange=exg
+	)
 
 
 def stock_contract(symbol, exchange='SMART', currency='USD'):
-	C = IBcontract()
-	C.symbol = symbol
-	C.secType = 'STK'
-	C.currency = currency
-	C.exchange = exchange
-	return C
+	return _contract(
+		symbol=symbol, secType='STK', currency=currency, exchange=exchange
+	)
 
 
 def future_contract(symbol, exchange='NYMEX'):
-	C = IBcontract()
-	C.secType = 'FUT'
-	C.exchange = exchange
-	C.currency = 'USD'
-	C.localSymbol = symbol
-	return C
+	return _contract(
+		secType='FUT', exchange=exchange, currency='USD', localSymbol=symbol
+	)
+
+
+_BAR_SIZE = re.compile(r'\s*(\d+)\s*([A-Za-z])')
 
 
+@lru_cache(maxsize=64)
 def to_pandas_offset(bar_size):
-	n, t = bar_size.split()
-	t = t[0].upper()
+	"""IB bar size, e.g. '5 mins' or '1day', to a pandas offset alias"""
+	n, t = _BAR_SIZE.match(bar_size).groups()
+	t = t.upper()
 	if t == 'M':
 		t = 'T'
 	return n+t